@@ -1,4 +1,25 @@
+from array import array
+
+
+def part(value, deep):  # hashable form of a child or leaf, nodes by identity unless <deep>
+    if isinstance(value, Node):
+        return value.structure() if deep else id(value)
+    if isinstance(value, list):
+        return tuple(part(item, deep) for item in value)
+    if isinstance(value, array):
+        return value.typecode, value.tobytes()
+    return type(value), value
+
+
+# Structural identity of nodes, used to hash-cons the tree. signature is
+# shallow and takes the children by identity, so it identifies a whole
+# subtree once its children are shared already, which is how the parser
+# interns bottom-up. structure is the deep form for any tree. Neither
+# replaces __eq__ and __hash__, nodes keep being compared by identity.
+
 class Node(object):
+    lineno = 0  # source line of the first token, 0 when unknown
+
     def __init__(self, type, children=None, leaf=None):
         self.type = type
         if children:
@@ -7,6 +28,15 @@ class Node(object):
             self.children = []
         self.leaf = leaf
 
+    def accept(self, visitor):
+        return visitor.visit(self)
+
+    def signature(self):
+        return (self.__class__, part(self.leaf, False)) + tuple(part(child, False) for child in self.children)
+
+    def structure(self):
+        return (self.__class__, part(self.leaf, True)) + tuple(part(child, True) for child in self.children)
+
 
 class BinaryExpression(Node):
     def __init__(self, left, operator, right):
@@ -159,7 +189,12 @@ class Access(Node):
 
 
 class Error(Node):
-    pass
+    def __init__(self, token=None):
+        super().__init__(self.__class__, [], 'ERROR')
+        self.token = token  # token the parser recovered from
+
+    def __repr__(self):
+        return 'ERROR'
 
 
 class Block(Node):
@@ -172,6 +207,8 @@ class Block(Node):
 
 
 class Program(Node):
+    unchecked = frozenset()  # Access nodes the shape pass proved in bounds
+
     def __init__(self, program):
         super().__init__(self.__class__, [program])
         self.program = program
@@ -208,6 +245,32 @@ class Matrix(Node):
         return self.dims == other.dims
 
 
+class ConstantMatrix(Matrix):  # matrix literal of numbers only, packed by the parser into one array
+    def __init__(self, data, dims):
+        Node.__init__(self, self.__class__, [], "MATRIX")
+        self.data = data
+        self.dims = dims
+        self.integers = ()  # positions of the integers of a literal packed into doubles
+
+    def __repr__(self):
+        rows, cols = self.dims
+        elements = self.elements()
+        return str([[("-{}({})" if x < 0 else "{}({})").format(type(x).__name__, abs(x))
+                     for x in elements[i * cols:(i + 1) * cols]] for i in range(rows)]).replace("'", "")
+
+    def elements(self):  # the numbers as written, with their own types
+        return [int(x) if i in self.integers else x for i, x in enumerate(self.data)]
+
+    def has_correct_dims(self):
+        return True
+
+    def signature(self):
+        return self.__class__, self.dims, part(self.data, False), self.integers
+
+    def structure(self):
+        return self.signature()
+
+
 class Value(Node):
     def __init__(self, primitive):
         super().__init__(self.__class__, [], primitive)
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+
+import json
+
+
+class Diagnostic(object):
+
+    def __init__(self, severity, code, message, line, column=None, start=None, end=None):
+        self.severity = severity  # 'error' or 'warning'
+        self.code = code
+        self.message = message
+        self.line = line
+        self.column = column  # None when unknown, at the end of the input for example
+        self.span = (start, end)  # character offsets in the source, end exclusive
+        self.count = 1  # merged occurrences
+
+    def dict(self):
+        return {'severity': self.severity, 'code': self.code, 'message': self.message, 'line': self.line,
+                'column': self.column, 'span': list(self.span), 'count': self.count}
+
+    def __repr__(self):
+        position = 'line {}'.format(self.line) if self.column is None else \
+            'line {}, column {}'.format(self.line, self.column)
+        return '{} at {}: {}'.format(self.severity.capitalize(), position, self.message)
+
+
+# Errors of one file, collected instead of printed. At most <limit> are
+# kept, the rest is only counted, and a run of illegal characters makes
+# a single record, so that a binary file costs a few records and not a
+# write per byte.
+
+class Diagnostics(object):
+
+    def __init__(self, limit=100):
+        self.limit = limit
+        self.records = []
+        self.dropped = 0
+        self.character = None  # first character of the latest run of illegal ones
+
+    def add(self, severity, code, message, line, column=None, start=None, end=None):
+        if len(self.records) >= self.limit:
+            self.dropped += 1
+            return None
+        record = Diagnostic(severity, code, message, line, column, start, end)
+        self.records.append(record)
+        return record
+
+    def error(self, code, message, line, column=None, start=None, end=None):
+        return self.add('error', code, message, line, column, start, end)
+
+    def illegal(self, character, line, column, position):
+        last = self.records[-1] if self.records else None
+        if last is not None and last.code == 'illegal-character' and last.span[1] == position:
+            last.span = (last.span[0], position + 1)
+            last.count += 1
+            last.message = '{} illegal characters starting with {!r}'.format(last.count, self.character)
+            return
+        self.character = character
+        self.error('illegal-character', 'illegal character {!r}'.format(character), line, column, position, position + 1)
+
+    @property
+    def errors(self):
+        return self.dropped + sum(record.severity == 'error' for record in self.records)
+
+    def __len__(self):
+        return len(self.records) + self.dropped
+
+    def text(self):
+        result = [repr(record) for record in self.records]
+        if self.dropped:
+            result.append('... {} more'.format(self.dropped))
+        return '\n'.join(result)
+
+    def json(self):
+        return json.dumps({'diagnostics': [record.dict() for record in self.records], 'dropped': self.dropped},
+                          indent=2)
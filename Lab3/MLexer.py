@@ -1,16 +1,53 @@
 #!/usr/bin/python
 
-import ply.lex as lex
+import os
+
+from Diagnostics import Diagnostics
 
 
 class MLexer:
 
-    newlines = [-1]
+    # Master regular expression generated into the mlextab module next to
+    # this file, it is rebuilt and validated only after the rules change.
+    directory = os.path.dirname(os.path.abspath(__file__))
+    lextab = 'mlextab'
 
     def __init__(self):
-        self.lexer = lex.lex(object=self)
+        import ply.lex as lex  # imported on first use, only scripts which are really lexed pay for PLY
+        fresh = self.fresh()
+        self.lexer = lex.lex(object=self, optimize=fresh, lextab=self.lextab, outputdir=self.directory)
+        if not fresh:
+            try:
+                self.lexer.writetab(self.lextab, self.directory)
+            except OSError:  # read-only install, the tables built in memory serve this process
+                pass
+        self.lexer.newlines = [-1]  # position of every newline, kept on the PLY lexer so that clones get their own
+        self.lexer.diagnostics = Diagnostics()
         self.result = []
 
+    @classmethod
+    def fresh(cls):
+        try:
+            table = os.stat(os.path.join(cls.directory, cls.lextab + '.py'))
+            return table.st_mtime >= os.stat(os.path.abspath(__file__)).st_mtime
+        except OSError:
+            return False
+
+    def clone(self, limit=100):  # fresh lexer sharing the master regular expression, one per concurrent parse
+        lexer = self.lexer.clone()
+        lexer.lineno = 1
+        lexer.newlines = [-1]
+        lexer.diagnostics = Diagnostics(limit)
+        return lexer
+
+    def mapped(self, filename, limit=100):  # lexer over the memory-mapped file, for inputs too large to read
+        from MappedLexer import MappedLexer
+        return MappedLexer(self, filename, limit)
+
+    def stream(self, chunks=(), limit=100):  # lexer over input arriving in chunks
+        from StreamLexer import StreamLexer
+        return StreamLexer(self, chunks, limit)
+
     def input(self, text):
         self.lexer.input(text)
 
@@ -34,7 +71,7 @@ class MLexer:
     def show_token(self, token):
         return "(%d, %d): %s(%s)" % (
             token.lineno,
-            MLexer.get_column(token),
+            MLexer.get_column(token, self.lexer),
             token.type,
             token.value
         )
@@ -144,19 +181,21 @@ class MLexer:
         MLexer.add_newline(t)
 
     def t_error(self, t):
-        print("illegal character '%s' at (%d, %d)" %
-              (t.value[0], t.lineno, self.get_column(t)))
+        t.lexer.diagnostics.illegal(t.value[0], t.lineno, self.get_column(t), t.lexpos)
         t.lexer.skip(1)
 
     @staticmethod
-    def get_column(t):
-        return (t.lexpos - MLexer.newlines[t.lineno - 1])
+    def get_column(t, lexer=None):  # only tokens of function rules carry their lexer
+        lexer = lexer or t.lexer
+        if lexer.newlines is None:  # a MappedLexer, which keeps no newline table
+            return lexer.column(t.lexpos)
+        return (t.lexpos - lexer.newlines[t.lineno - 1])
 
     @staticmethod
-    def get_position(t):
-        return t.lineno, MLexer.get_column(t)
+    def get_position(t, lexer=None):
+        return t.lineno, MLexer.get_column(t, lexer)
 
     @staticmethod
     def add_newline(t):
         for i in range(len(t.value)):
-            MLexer.newlines.append(t.lexpos + i)
+            t.lexer.newlines.append(t.lexpos + i)
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+import mmap
+import re
+
+from Diagnostics import Diagnostics
+
+
+class Token(object):  # what the PLY parser needs of a token
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return 'Token(%s,%r,%d,%d)' % (self.type, self.value, self.lineno, self.lexpos)
+
+
+# Lexer over a memory-mapped file, for scripts too large to read into a
+# str. It matches the bytes of the map with the master regular
+# expression of an MLexer compiled for bytes, so the rules and their
+# order stay those of PLY. Only identifiers, numbers and strings are
+# decoded, positions are byte offsets into the map, and no newline table
+# is kept: the column of a token is found by searching the map backwards.
+
+class MappedLexer(object):
+
+    def __init__(self, mLexer, filename, limit=100):
+        self.master = MappedLexer.compile(mLexer)
+        self.reserved = mLexer.reserved
+        with open(filename, 'rb') as file:
+            try:
+                self.lexdata = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # an empty file cannot be mapped
+                self.lexdata = b''
+        self.lexlen = len(self.lexdata)
+        self.lexpos = 0
+        self.lineno = 1
+        self.linestart = -1  # offset of the last newline lexed
+        self.newlines = None
+        self.diagnostics = Diagnostics(limit)
+        self.words = {}  # bytes of identifiers and operators -> type and decoded value
+
+    @staticmethod
+    def compile(mLexer):  # bytes version of the master regular expression, built once per MLexer
+        if getattr(mLexer, 'bytes_master', None) is None:
+            lexer = mLexer.lexer
+            mLexer.bytes_master = [(re.compile(regex.pattern.encode(), regex.flags & ~re.UNICODE),
+                                    [rule and rule[1] for rule in index]) for regex, index in lexer.lexre], \
+                frozenset(lexer.lexignore.encode())
+        return mLexer.bytes_master
+
+    def column(self, lexpos):  # of any earlier token, for the current line linestart is faster
+        return lexpos - self.lexdata.rfind(b'\n', 0, lexpos)
+
+    def token(self):
+        rules, ignore = self.master
+        data, lexpos, length = self.lexdata, self.lexpos, self.lexlen
+        while lexpos < length:
+            if data[lexpos] in ignore:
+                lexpos += 1
+                continue
+            for regex, index in rules:
+                match = regex.match(data, lexpos)
+                if match:
+                    break
+            else:
+                self.diagnostics.illegal(data[lexpos:lexpos + 1].decode('latin-1'), self.lineno,
+                                         lexpos - self.linestart, lexpos)
+                lexpos += 1
+                continue
+            type = index[match.lastindex]
+            start, lexpos = lexpos, match.end()
+            if type is None:  # comment
+                continue
+            if type == 'newline':
+                self.lineno += lexpos - start
+                self.linestart = lexpos - 1
+                continue
+            text = match.group()
+            if type == 'INT':
+                value = int(text)
+            elif type == 'FLOAT':
+                value = float(text)
+            elif type == 'STRING':
+                value = text.decode('utf-8')
+            else:
+                word = self.words.get(text)
+                if word is None:
+                    value = text.decode('ascii')
+                    word = self.words[text] = (self.reserved.get(value, 'ID') if type == 'ID' else type, value)
+                type, value = word
+            self.lexpos = lexpos
+            return Token(type, value, self.lineno, start)
+        self.lexpos = lexpos
+        return None
+
+    def __iter__(self):
+        return iter(self.token, None)
+
+    def close(self):
+        if isinstance(self.lexdata, mmap.mmap):
+            self.lexdata.close()
@@ -1,25 +1,132 @@
 #!/usr/bin/python
 
-import ply.yacc as yacc
+from array import array
+import copy
+import functools
+import os
+
 import AST as ast
 from MLexer import MLexer
 
 
+class ParseState:  # everything a single parse changes, every MParser.parse call gets its own
+
+    def __init__(self, parser, lexer):
+        self.parser = parser  # shallow copy of the built parser, its tables are shared and never written
+        self.lexer = lexer
+        self.lexer.state = self  # grammar actions reach the state through p.lexer
+        self.diagnostics = lexer.diagnostics  # shared with the lexer, which adds illegal characters
+        self.shared = None  # Node.signature -> node when the parse hash-conses pure subtrees
+        self.ast = None
+
+    @property
+    def failed(self):
+        return self.diagnostics.errors > 0 or not self.parser.errorok
+
+    def report(self, code, message, line, column=None, start=None, end=None):
+        self.diagnostics.error(code, message, line, column, start, end)
+
+
+# Once built, an MParser only holds read-only tables: the LALR tables of
+# PLY and the master regular expression of the lexer. Any number of
+# threads may call parse on one instance at the same time.
+
 class MParser:
     tokens = MLexer.tokens
 
     def __init__(self):
         self.parser = None
         self.matrix_lexer = MLexer()
-        self.symtab = {}
-        self.error = False
-
-    def build(self, **kwargs):
-        self.parser = yacc.yacc(module=self)
+        self.error = False  # outcome of the last run, parse reports it in the state of each call
+        self.diagnostics = None
+
+    # LALR tables pickled next to this file, PLY regenerates them when
+    # the grammar signature changes. Unpickling them is much faster than
+    # importing the parsetab module, which rebuilds its dictionaries.
+    tables = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parsetab.pickle')
+
+    def build(self, **kwargs):  # call before sharing the parser between threads
+        import ply.yacc as yacc
+        if self.parser is None:
+            self.parser = yacc.yacc(module=self, picklefile=self.tables)
+
+    def state(self, limit=100, lexer=None, share=False):  # <limit> diagnostics are kept, the rest only counted
+        self.build()
+        parser = copy.copy(self.parser)
+        state = ParseState(parser, lexer or self.matrix_lexer.clone(limit))
+        if share:
+            state.shared = {}
+        parser.errorfunc = functools.partial(self.syntax_error, state)
+        return state
+
+    def parse(self, text, state=None, tokenfunc=None):  # reentrant, returns the ParseState holding the tree
+        # <text> is None when the lexer of <state> already has its input, a mapped file for example
+        state = state or self.state()
+        state.ast = state.parser.parse(text, lexer=state.lexer, tokenfunc=tokenfunc)
+        if state.shared:
+            state.shared = {}  # the tree holds what is shared, the table would only keep the signatures alive
+        return state
+
+    # Streaming parse: the tokens are cut at the end of every top-level
+    # instruction, a SEMICOLON or RCURLY outside any brackets which no
+    # ELSE follows, and each piece is parsed on its own as a program of
+    # one instruction. Instructions come out as soon as their last token
+    # is read, while the rest of the input may still be arriving.
+
+    opening = {'LPAREN', 'LBRACKET', 'LCURLY'}
+    closing = {'RPAREN', 'RBRACKET', 'RCURLY'}
+
+    def instructions(self, text, state=None):  # generator of top-level instructions, <text> as in parse
+        state = state or self.state()
+        if text is not None:
+            state.lexer.input(text)
+        piece, depth, complete = [], 0, False
+        for token in iter(state.lexer.token, None):
+            if complete and token.type != 'ELSE':
+                yield from self.piece(state, piece)
+                piece, complete = [], False
+            piece.append(token)
+            if token.type in self.opening:
+                depth += 1
+            elif token.type in self.closing:
+                depth = max(depth - 1, 0)
+            complete = depth == 0 and token.type in ('SEMICOLON', 'RCURLY')
+        if piece:
+            yield from self.piece(state, piece)
+
+    def piece(self, state, tokens):
+        program = state.parser.parse(None, lexer=state.lexer, tokenfunc=functools.partial(next, iter(tokens), None))
+        return program.program.instructions if program is not None else []
 
     def run(self, s, **kwargs):
-        self.build(**kwargs)
-        return self.parser.parse(s, lexer=self.matrix_lexer.lexer)
+        state = self.parse(s)
+        self.error = state.failed
+        self.diagnostics = state.diagnostics
+        return state.ast
+
+    # Hash-consing, on with state(share=True): every leaf and pure
+    # expression is replaced by the first structurally equal node of the
+    # same line of the parse, so repeated subtrees exist once a line and
+    # equal subtrees are the same object. Keying on the line keeps the
+    # position of every node the checker or the profiler may report.
+    # Literals, numbers, strings and constant matrices, are never
+    # reported and are shared across the whole parse with no line of
+    # their own. Sequences, rows and blocks still grow while parsed and
+    # are shared only once complete.
+
+    @staticmethod
+    def share(p, node):
+        shared = p.lexer.state.shared
+        if shared is None:
+            return node
+        if type(node) is ast.ConstantMatrix or type(node) is ast.Value and not isinstance(node.primitive, ast.Node):
+            node.lineno = 0  # a literal takes the line of the node around it
+            return shared.setdefault(node.signature(), node)
+        return shared.setdefault((node.lineno,) + node.signature(), node)
+
+    @staticmethod
+    def line(p, n=1):  # nodes carry the line of their first token, tokens their own
+        return getattr(p[n], 'lineno', 0) or p.lineno(n)
 
     precedence = (
         ('nonassoc', 'IF'),
@@ -65,18 +172,44 @@ class MParser:
         """
         p[0] = p[1]
 
+    # Panic mode recovery: after a syntax error the parser skips to the
+    # end of the instruction or of the enclosing braces and leaves an
+    # Error node there, so that one parse reports every error.
+
+    def p_instruction_error(self, p):
+        """
+        instruction : error SEMICOLON
+        """
+        p[0] = ast.Error(p[1].value)
+        p[0].lineno = p.lineno(1)
+
+    def p_block_error(self, p):
+        """
+        block : block LCURLY error RCURLY
+              | LCURLY error RCURLY
+        """
+        error = ast.Error(p[len(p) - 2].value)
+        error.lineno = p.lineno(len(p) - 2)
+        if len(p) == 5:
+            p[1].instructions.append(error)
+            p[0] = p[1]
+        else:
+            p[0] = ast.Block(error)
+
     def p_statement(self, p):
         """
         statement : assignment
                   | keyword
         """
         p[0] = ast.Instruction(p[1])
+        p[0].lineno = self.line(p)
 
     def p_assignment(self, p):
         """
         assignment : variable assignment_operator expression
         """
         p[0] = ast.Assignment(p[1], p[2], p[3])
+        p[0].lineno = self.line(p)
 
     def p_variable(self, p):
         """
@@ -84,12 +217,16 @@ class MParser:
                  | access
         """
         p[0] = ast.Variable(p[1])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_access(self, p):
         """
         access : ID LBRACKET sequence RBRACKET
         """
-        p[0] = ast.Access(p[1], p[3])
+        p[0] = ast.Access(p[1], self.share(p, p[3]))
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_sequence(self, p):
         """
@@ -111,25 +248,104 @@ class MParser:
               | access
         """
         p[0] = ast.Value(p[1])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_matrix(self, p):
         """
         matrix : LBRACKET rows RBRACKET
         """
-        p[0] = ast.Matrix(p[2])
+        rows = p[2]
+        if isinstance(rows, ast.ConstantMatrix):
+            data = self.pack(rows.data)
+            if data is not None:
+                if data.typecode == 'd':
+                    rows.integers = frozenset(i for i, x in enumerate(rows.data) if isinstance(x, int))
+                rows.data = data
+                rows.lineno = p.lineno(1)
+                p[0] = self.share(p, rows)
+                return
+        p[0] = ast.Matrix(self.expand(rows))
+        p[0].lineno = p.lineno(1)
 
     def p_rows(self, p):
         """
-        rows : rows SEMICOLON sequence
+        rows : rows SEMICOLON row
         """
-        p[1].row_list.append(p[3])
-        p[0] = p[1]
+        if isinstance(p[1], ast.ConstantMatrix) and isinstance(p[3], list):
+            rows, cols = p[1].dims
+            if len(p[3]) == cols:
+                p[1].data += p[3]
+                p[1].dims = rows + 1, cols
+                p[0] = p[1]
+                return
+            semicolon = p.slice[2]
+            p.lexer.state.report('ragged-matrix', 'matrix rows of different lengths', semicolon.lineno,
+                                 MLexer.get_column(semicolon, p.lexer), semicolon.lexpos, semicolon.lexpos + 1)
+        p[0] = self.expand(p[1])
+        p[0].row_list.append(self.expand(p[3]))
+
+    def p_rows_row(self, p):
+        """
+        rows : row
+        """
+        p[0] = ast.ConstantMatrix(p[1], (1, len(p[1]))) if isinstance(p[1], list) else ast.Rows(p[1])
 
     def p_row(self, p):
         """
-        rows : sequence
+        row : row COMMA expression
+            | expression
         """
-        p[0] = ast.Rows(p[1])
+        row, expression = (p[1], p[3]) if len(p) == 4 else ([], p[1])
+        value = self.constant(expression)
+        if isinstance(row, list) and value is not None:
+            row.append(value)
+        else:
+            row = self.expand(row)
+            if row is None:
+                row = ast.Sequence(expression)
+            else:
+                row.expressions.append(expression)
+        p[0] = row
+
+    # Rows of an all-constant matrix literal are gathered as plain numbers
+    # and packed into one ConstantMatrix, any other element turns them
+    # back into Sequence and Rows nodes.
+
+    @staticmethod
+    def constant(expression):
+        if isinstance(expression, ast.Negation) and type(expression.operand) is ast.Value:
+            value = MParser.constant(expression.operand)
+            return -value if value is not None and value > 0 else None
+        if type(expression) is ast.Value and type(expression.primitive) in (int, float):
+            return expression.primitive
+        return None
+
+    @staticmethod
+    def expand(row):
+        if isinstance(row, ast.ConstantMatrix):
+            rows, cols = row.dims
+            result = ast.Rows(MParser.expand(row.data[:cols]))
+            result.row_list += [MParser.expand(row.data[i * cols:(i + 1) * cols]) for i in range(1, rows)]
+            return result
+        if isinstance(row, list):
+            values = [ast.Value(x) if x >= 0 else ast.Negation(ast.Value(-x)) for x in row]
+            if not values:
+                return None
+            result = ast.Sequence(values[0])
+            result.expressions += values[1:]
+            return result
+        return row
+
+    @staticmethod
+    def pack(values):  # None when an integer fits neither a machine integer nor a double
+        try:
+            try:
+                return array('q', values)
+            except TypeError:
+                return array('d', values)
+        except OverflowError:
+            return None
 
     def p_expression_value(self, p):
         """
@@ -140,24 +356,34 @@ class MParser:
     def p_expression_id(self, p):
         """expression : ID"""
         p[0] = ast.Variable(p[1])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_expression_minus(self, p):
         """
         expression : MINUS expression %prec UMINUS
         """
         p[0] = ast.Negation(p[2])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_id_transpose(self, p):
         """
         expression : ID TRANSPOSE
         """
-        p[0] = ast.Transposition(ast.Variable(p[1]))
+        operand = ast.Variable(p[1])
+        operand.lineno = self.line(p)
+        p[0] = ast.Transposition(self.share(p, operand))
+        p[0].lineno = operand.lineno
+        p[0] = self.share(p, p[0])
 
     def p_expression_transpose(self, p):
         """
         expression : LPAREN expression RPAREN TRANSPOSE
         """
         p[0] = ast.Transposition(p[2])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_expression_paren(self, p):
         """
@@ -177,78 +403,103 @@ class MParser:
                    | expression DOTDIVIDE expression
         """
         p[0] = ast.BinaryExpression(p[1], p[2], p[3])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_expression_fun(self, p):
         """
         expression : function LPAREN sequence RPAREN
         """
-        p[0] = ast.Function(p[1], p[3])
+        p[0] = ast.Function(p[1], self.share(p, p[3]))
+        p[0].lineno = self.line(p, 2)
+        p[0] = self.share(p, p[0])
 
     def p_keyword_print(self, p):
         """
         keyword : PRINT sequence
         """
         p[0] = ast.Print(p[2])
+        p[0].lineno = self.line(p)
 
     def p_keyword_break(self, p):
         """
         keyword : BREAK
         """
         p[0] = ast.Break()
+        p[0].lineno = self.line(p)
 
     def p_keyword_continue(self, p):
         """
         keyword : CONTINUE
         """
         p[0] = ast.Continue()
+        p[0].lineno = self.line(p)
 
     def p_keyword_return(self, p):
         """
         keyword : RETURN expression
         """
         p[0] = ast.Return(p[2])
+        p[0].lineno = self.line(p)
 
     def p_relation(self, p):
         """relation : expression comparison_operator expression"""
         p[0] = ast.BinaryExpression(p[1], p[2], p[3])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_body(self, p):
         """body : instruction"""
         p[0] = ast.Instruction(p[1])
+        p[0].lineno = self.line(p)
 
     def p_body_curly(self, p):
         """body : LCURLY block RCURLY"""
         p[0] = ast.Instruction(p[2])
+        p[0].lineno = self.line(p)
+
+    def p_body_error(self, p):
+        """body : LCURLY error RCURLY"""
+        p[0] = ast.Instruction(ast.Error(p[2].value))
+        p[0].lineno = p[0].line.lineno = p.lineno(2)
 
     def p_if_statement(self, p):
         """
         if_statement : IF LPAREN relation RPAREN body %prec IF
         """
         p[0] = ast.If(p[3], p[5])
+        p[0].lineno = self.line(p)
 
     def p_if_else_statement(self, p):
         """
         if_statement : IF LPAREN relation RPAREN body ELSE body
         """
         p[0] = ast.If(p[3], p[5], p[7])
+        p[0].lineno = self.line(p)
 
     def p_while_statement(self, p):
         """while_statement : WHILE LPAREN relation RPAREN body"""
         p[0] = ast.While(p[3], p[5])
+        p[0].lineno = self.line(p)
 
     def p_for_statement(self, p):
         """for_statement : FOR ID ASSIGN range body"""
         p[0] = ast.For(p[2], p[4], p[5])
+        p[0].lineno = self.line(p)
 
     def p_range(self, p):
         """range : expression COLON expression"""
         p[0] = ast.Range(p[1], p[3])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_range_step(self, p):
         """
          range : expression COLON expression COLON expression
         """
         p[0] = ast.Range(p[1], p[3], p[5])
+        p[0].lineno = self.line(p)
+        p[0] = self.share(p, p[0])
 
     def p_assignment_operator(self, p):
         """
@@ -279,12 +530,12 @@ class MParser:
         """
         p[0] = p[1]
 
-    def p_error(self, p):
-        self.error = True
+    def p_error(self, p):  # PLY wants it, but each parse replaces it with syntax_error bound to its state
+        raise RuntimeError('parse with MParser.parse, the shared parser has no state to record errors in')
+
+    def syntax_error(self, state, p):
         if p:
-            line = p.lexer.lineno if hasattr(p.lexer, 'lineno') else p.lexer.lexer.lineno
-            value = p.value
+            state.report('syntax', 'illegal symbol {}'.format(p.value), p.lineno, MLexer.get_column(p, p.lexer),
+                         p.lexpos, p.lexer.lexpos)  # the parser gave up on the token it just read
         else:
-            line = 'last'
-            value = ''
-        print('/' * 40 + '\nERROR\nIllegal symbol {} at line {}\n'.format(value, line) + '/' * 40)
+            state.report('end-of-input', 'unexpected end of input', state.lexer.lineno)
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+
+from Diagnostics import Diagnostics
+from MappedLexer import Token
+
+
+# Lexer over input arriving in chunks, from a pipe for example. It runs
+# the rules of an MLexer on a buffer of the text not lexed yet and only
+# emits a token once at least LOOKAHEAD characters follow it, or the
+# input is closed, so that a token split between chunks (an identifier,
+# a FLOAT whose exponent is still coming, <= after <) is never cut. No
+# token spans a newline, which bounds how far a STRING can be pending.
+# The tokens, lines and columns are those of lexing the whole text.
+#
+# Push input with feed and close, which return the completed tokens, or
+# give an iterable of chunks and let the parser pull through token.
+
+LOOKAHEAD = 3  # longest look past a token that may change it: 1. -> 1.e+5
+
+
+class StreamLexer(object):
+
+    def __init__(self, mLexer, chunks=(), limit=100):
+        self.master = mLexer.lexer.lexre
+        self.ignore = mLexer.lexer.lexignore
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.base = 0  # offset of buffer[0] in the whole input
+        self.position = 0  # next character of the buffer to lex
+        self.closed = False
+        self.lexpos = 0
+        self.lineno = 1
+        self.newlines = [-1]
+        self.diagnostics = Diagnostics(limit)
+
+    def feed(self, chunk):  # tokens completed by <chunk>
+        self.append(chunk)
+        return list(iter(self.next, None))
+
+    def close(self):  # the remaining tokens
+        self.closed = True
+        return list(iter(self.next, None))
+
+    def token(self):  # next token, pulling chunks as needed
+        while True:
+            token = self.next()
+            if token is not None or self.closed:
+                return token
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.closed = True
+            else:
+                self.append(chunk)
+
+    def __iter__(self):
+        return iter(self.token, None)
+
+    def append(self, chunk):
+        if self.position:  # drop what is lexed already
+            self.base += self.position
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        self.buffer += chunk
+
+    def next(self):  # next token of the buffer, None when it needs more input or is finished
+        buffer, position = self.buffer, self.position
+        while position < len(buffer):
+            if buffer[position] in self.ignore:
+                position += 1
+                continue
+            for regex, index in self.master:
+                match = regex.match(buffer, position)
+                if match:
+                    break
+            else:
+                if not self.closed and buffer[position] == '"' and '\n' not in buffer[position:]:
+                    break  # a STRING still being received
+                self.diagnostics.illegal(buffer[position], self.lineno,
+                                         self.base + position - self.newlines[self.lineno - 1], self.base + position)
+                position += 1
+                continue
+            if not self.closed and match.end() + LOOKAHEAD > len(buffer):
+                break
+            function, type = index[match.lastindex]
+            token = Token(type, match.group(), self.lineno, self.base + position)
+            position = self.position = match.end()
+            self.lexpos = self.base + position
+            if function is None and type is None:  # comment
+                continue
+            if function is not None:
+                token.lexer = self
+                token = function(token)  # None for newlines, which the rule counts
+                if token is None:
+                    continue
+            return token
+        self.position = position
+        self.lexpos = self.base + position
+        return None
@@ -39,6 +39,19 @@ class TreePrinter:
         else:
             return self.withoutLeaf(indent)
 
+    @addToClass(AST.ConstantMatrix)
+    def printTree(self, indent=0):
+        rows, cols = self.dims
+        res = [sep(indent) + self.leaf]
+        elements = self.elements()
+        for i in range(rows):
+            if cols > 1:
+                res.append(sep(indent + 1) + 'SEQ')
+            for x in elements[i * cols:(i + 1) * cols]:
+                ind = indent + 1 + (cols > 1)
+                res += [sep(ind) + '-', sep(ind + 1) + str(-x)] if x < 0 else [sep(ind) + str(x)]
+        return '\n'.join(res)
+
     @addToClass(AST.Node)
     def withLeaf(self, indent):
         res = [self.printLeaf(self.leaf, indent)]
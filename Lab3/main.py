@@ -15,7 +15,9 @@ if __name__ == '__main__':
     text = file.read()
     mParser = MParser()
     ast = mParser.run(text)
-    if mParser.error or not mParser.parser.errorok:
+    if mParser.diagnostics:
+        print(mParser.diagnostics.text())
+    if mParser.error:
         sys.exit(1)
     print(ast.printTree())
 
@@ -1,37 +1,50 @@
 #!/usr/bin/python
 
 
+class Symbol(object):
+    pass
+
+
 class VariableSymbol(Symbol):
 
     def __init__(self, name, type):
-        pass
+        self.name = name
+        self.type = type
     #
 
+    def __repr__(self):
+        return '{}: {}'.format(self.name, self.type)
+
 
 class SymbolTable(object):
 
     def __init__(self, parent, name): # parent scope and symbol table name
-        pass
+        self.parent = parent
+        self.name = name
+        self.symbols = {}
     #
 
     def put(self, name, symbol): # put variable symbol or fundef under <name> entry
-        pass
+        self.symbols[name] = symbol
     #
 
     def get(self, name): # get variable symbol or fundef from <name> entry
-        pass
+        scope = self
+        while scope is not None:
+            if name in scope.symbols:
+                return scope.symbols[name]
+            scope = scope.parent
+        return None
     #
 
     def getParentScope(self):
-        pass
+        return self.parent
     #
 
     def pushScope(self, name):
-        pass
+        return SymbolTable(self, name)
     #
 
     def popScope(self):
-        pass
+        return self.parent
     #
-
-
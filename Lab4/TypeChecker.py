@@ -1,5 +1,8 @@
 #!/usr/bin/python
 
+import AST
+from Diagnostics import Diagnostics
+from SymbolTable import SymbolTable, VariableSymbol
 
 
 class NodeVisitor(object):
@@ -29,21 +32,241 @@ class NodeVisitor(object):
     #        self.visit(child)
 
 
+class MatrixType(object):
+
+    def __init__(self, rows=None, cols=None): # None for a dimension not known statically
+        self.rows = rows
+        self.cols = cols
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols) if self.rows is not None and self.cols is not None else None
+
+    def __eq__(self, other):
+        return isinstance(other, MatrixType) and self.shape == other.shape
+
+    def __hash__(self):
+        return hash(self.shape)
+
+    def __repr__(self):
+        return 'matrix {}x{}'.format(*self.shape) if self.shape else 'matrix'
+
+
+numeric = ('int', 'float')
+
+
+def is_matrix(type):
+    return isinstance(type, MatrixType)
+
+
+# Every visit returns the type of the node: 'int', 'float', 'string',
+# 'bool', a MatrixType, or None when it is unknown, which is also what
+# an erroneous expression gets so that a single error is reported once.
+# Given a <types> dict the checker also records the type of every node
+# there, for the optimization passes. A node reached in several places,
+# as shared nodes are, gets None unless all its types agree. Errors go
+# to <diagnostics>, the sink of the parse when given.
 
 class TypeChecker(NodeVisitor):
 
-    def visit_BinExpr(self, node):
-                                          # alternative usage,
-                                          # requires definition of accept method in class Node
-        type1 = self.visit(node.left)     # type1 = node.left.accept(self) 
-        type2 = self.visit(node.right)    # type2 = node.right.accept(self)
-        op    = node.op
-        # ... 
-        #
- 
+    def __init__(self, table=None, types=None, diagnostics=None):
+        self.table = table if table is not None else SymbolTable(None, 'global')
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+        self.loops = 0
+        self.conditional = 0  # inside an if or a loop body, which may not run
+        self.types = types  # node -> type
+
+    def visit(self, node):
+        type = NodeVisitor.visit(self, node)
+        if self.types is not None and isinstance(node, AST.Node):
+            self.types[node] = type if self.types.get(node, type) == type else None
+        return type
+
+    @property
+    def errors(self):
+        return self.diagnostics.errors
+
+    def error(self, node, message):
+        self.diagnostics.error('type', message, node.lineno)
+
+    def branch(self, node):
+        self.conditional += 1
+        self.visit(node)
+        self.conditional -= 1
+
+    def declare(self, name, type):
+        symbol = self.table.get(name)
+        if self.conditional and symbol is not None and symbol.type != type:
+            type = None
+        self.table.put(name, VariableSymbol(name, type))
+
+    def visit_Value(self, node):
+        value = node.primitive
+        if isinstance(value, AST.Node):
+            return self.visit(value)
+        return {int: 'int', float: 'float', str: 'string'}[type(value)]
 
     def visit_Variable(self, node):
-        pass
-        
+        symbol = self.table.get(node.name)
+        if symbol is None:
+            self.error(node, "undefined variable '{}'".format(node.name))
+            return None
+        return symbol.type
+
+    def visit_Sequence(self, node):
+        return [self.visit(expression) for expression in node.expressions]
 
+    def visit_Matrix(self, node):
+        rows = [self.visit(row) for row in node.rows.row_list]
+        if len(set(map(len, rows))) > 1:
+            self.error(node, 'matrix rows of different lengths {}'.format(', '.join(str(len(row)) for row in rows)))
+            return None
+        for type in sum(rows, []):
+            if type is not None and type not in numeric:
+                self.error(node, 'matrix element of type {}'.format(type))
+                return None
+        return MatrixType(len(rows), len(rows[0]))
 
+    def visit_ConstantMatrix(self, node):
+        return MatrixType(*node.dims)
+
+    def index(self, node, matrix, key):
+        types = self.visit(key)
+        if any(type is not None and type != 'int' for type in types):
+            self.error(node, 'matrix indices must be integers')
+        if len(types) not in (1, 2):
+            self.error(node, '{} indices for a matrix'.format(len(types)))
+            return
+        if not is_matrix(matrix) or matrix.shape is None:
+            return
+        bounds = [matrix.rows * matrix.cols] if len(types) == 1 else matrix.shape
+        for expression, bound in zip(key.expressions, bounds):
+            if type(expression) is AST.Value and type(expression.primitive) is int \
+                    and not 1 <= expression.primitive <= bound:
+                self.error(node, 'index {} out of range 1..{} for {}'.format(expression.primitive, bound, matrix))
+
+    def visit_Access(self, node):
+        symbol = self.table.get(node.variable)
+        if symbol is None:
+            self.error(node, "undefined variable '{}'".format(node.variable))
+            return None
+        if symbol.type is not None and not is_matrix(symbol.type):
+            self.error(node, "'{}' of type {} is not a matrix".format(node.variable, symbol.type))
+            return None
+        self.index(node, symbol.type, node.key)
+        return 'float'
+
+    def visit_Function(self, node):
+        types = self.visit(node.argument)
+        if len(types) not in (1, 2) or any(type is not None and type != 'int' for type in types):
+            self.error(node, '{} expects one or two integer arguments'.format(node.name))
+            return MatrixType()
+        sizes = [expression.primitive if type(expression) is AST.Value else None
+                 for expression in node.argument.expressions]
+        for size in sizes:
+            if isinstance(size, int) and size < 1:
+                self.error(node, '{} with non-positive size {}'.format(node.name, size))
+        return MatrixType(sizes[0], sizes[-1])
+
+    def binary(self, node, operator, left, right):
+        if left is None or right is None:
+            return None
+        if operator in ('<', '>', '<=', '>=', '==', '!='):
+            if left in numeric and right in numeric or left == right == 'string' \
+                    or operator in ('==', '!=') and (is_matrix(left) or is_matrix(right)):
+                return 'bool'
+        elif left in numeric and right in numeric:
+            return 'int' if left == right == 'int' and operator not in ('/', './') else 'float'
+        elif left == 'string' or right == 'string':
+            if operator == '+' and left == right or operator == '*' and 'int' in (left, right):
+                return 'string'
+        elif is_matrix(left) and is_matrix(right):
+            if operator == '*':
+                if None not in (left.cols, right.rows) and left.cols != right.rows:
+                    self.error(node, 'cannot multiply {} and {}'.format(left, right))
+                    return None
+                return MatrixType(left.rows, right.cols)
+            if operator != '/':
+                if left.shape and right.shape and left.shape != right.shape:
+                    self.error(node, 'incompatible dimensions of {} and {} in {}'.format(left, right, operator))
+                    return None
+                return left if left.shape else right
+        elif is_matrix(left) and right in numeric:
+            return left
+        elif left in numeric and is_matrix(right) and operator != '/':
+            return right
+        self.error(node, 'unsupported operand types for {}: {} and {}'.format(operator, left, right))
+        return None
+
+    def visit_BinaryExpression(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return self.binary(node, node.operator, left, right)
+
+    def visit_Negation(self, node):
+        type = self.visit(node.operand)
+        if type in ('string', 'bool'):
+            self.error(node, 'bad operand type for unary -: {}'.format(type))
+            return None
+        return type
+
+    def visit_Transposition(self, node):
+        type = self.visit(node.operand)
+        if is_matrix(type):
+            return MatrixType(type.cols, type.rows)
+        return type
+
+    def visit_Assignment(self, node):
+        right = self.visit(node.right)
+        target = node.left.name
+        if isinstance(target, AST.Access):
+            self.visit(target)
+            if right is not None and right not in numeric:
+                self.error(node, 'cannot store {} in a matrix element'.format(right))
+        elif node.operator == '=':
+            self.declare(target, right)
+        else:
+            current = self.visit(node.left)
+            self.declare(target, self.binary(node, node.operator[0], current, right))
+
+    def visit_Print(self, node):
+        self.visit(node.expression)
+
+    def visit_If(self, node):
+        self.visit(node.condition)
+        self.branch(node.expression)
+        if node.else_expression is not None:
+            self.branch(node.else_expression)
+
+    def visit_While(self, node):
+        self.visit(node.condition)
+        self.loops += 1
+        self.branch(node.body)
+        self.loops -= 1
+
+    def visit_Range(self, node):
+        for bound in (node.start, node.end, node.step):
+            type = self.visit(bound) if isinstance(bound, AST.Node) else 'int'
+            if type is not None and type != 'int':  # the loop variable is an int
+                self.error(node, 'range bound of type {}'.format(type))
+
+    def visit_For(self, node):
+        self.visit(node.range)
+        self.declare(node.id, 'int')
+        self.loops += 1
+        self.branch(node.body)
+        self.loops -= 1
+
+    def visit_Break(self, node):
+        if not self.loops:
+            self.error(node, "'break' outside loop")
+
+    def visit_Continue(self, node):
+        if not self.loops:
+            self.error(node, "'continue' outside loop")
+
+    def visit_Return(self, node):
+        self.visit(node.result)
+
+    def visit_Error(self, node):
+        pass
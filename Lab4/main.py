@@ -1,7 +1,10 @@
 
+import os
 import sys
-import ply.yacc as yacc
-from Mparser import Mparser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Lab3'))
+
+from Mparser import MParser
 from TreePrinter import TreePrinter
 from TypeChecker import TypeChecker
 
@@ -14,13 +17,19 @@ if __name__ == '__main__':
         print("Cannot open {0} file".format(filename))
         sys.exit(0)
 
-    Mparser = Mparser()
-    parser = yacc.yacc(module=Mparser)
+    mParser = MParser()
     text = file.read()
 
-    ast = parser.parse(text, lexer=Mparser.scanner)
+    ast = mParser.run(text)
+    if mParser.diagnostics:
+        print(mParser.diagnostics.text())
+    if mParser.error:
+        sys.exit(1)
 
     # Below code shows how to use visitor
-    typeChecker = TypeChecker()   
+    typeChecker = TypeChecker()
     typeChecker.visit(ast)   # or alternatively ast.accept(typeChecker)
-    
\ No newline at end of file
+    if typeChecker.diagnostics:
+        print(typeChecker.diagnostics.text())
+    if typeChecker.errors:
+        sys.exit(1)
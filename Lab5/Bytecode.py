@@ -0,0 +1,103 @@
+import os
+import pickle
+
+# Binary operators come first so that the VM dispatches all of them with
+# a single comparison, compound assignments follow right after them.
+opnames = (
+    'PLUS', 'MINUS', 'TIMES', 'DIVIDE', 'DOTPLUS', 'DOTMINUS', 'DOTTIMES', 'DOTDIVIDE',
+    'LESS', 'MORE', 'LESSEQUAL', 'MOREEQUAL', 'INEQUAL', 'EQUAL',
+    'PLUSASSIGN', 'MINUSASSIGN', 'TIMESASSIGN', 'DIVIDEASSIGN',
+    'LOAD_CONST', 'LOAD_NAME', 'ASSIGN', 'LOAD_ELEMENT', 'STORE_ELEMENT', 'LOAD_MATRIX', 'BUILD_MATRIX',
+    'LOAD_ELEMENT_UNCHECKED', 'STORE_ELEMENT_UNCHECKED',
+    'UMINUS', 'TRANSPOSE', 'EYE', 'ZEROS', 'ONES', 'PRINT',
+    'RANGE', 'FOR_ITER', 'POP', 'JUMP', 'JUMP_IF_FALSE', 'RETURN',
+    # superinstructions made by the peephole optimizer
+    'NAME_CONST_BINARY', 'NAME_NAME_BINARY', 'NAME_CONST_BINARY_ASSIGN', 'NAME_NAME_BINARY_ASSIGN',
+    'NAME_CONST_BINARY_JUMP', 'NAME_NAME_BINARY_JUMP', 'FOR_ITER_ASSIGN', 'CONST_ASSIGN', 'ASSIGN_LOAD',
+    'COUNT',
+)
+
+for opcode, name in enumerate(opnames):
+    globals()[name] = opcode
+
+binary_opcodes = {
+    '+': PLUS, '-': MINUS, '*': TIMES, '/': DIVIDE,
+    '.+': DOTPLUS, '.-': DOTMINUS, '.*': DOTTIMES, './': DOTDIVIDE,
+    '<': LESS, '>': MORE, '<=': LESSEQUAL, '>=': MOREEQUAL, '!=': INEQUAL, '==': EQUAL,
+}
+
+assignment_opcodes = {'+=': PLUSASSIGN, '-=': MINUSASSIGN, '*=': TIMESASSIGN, '/=': DIVIDEASSIGN}
+
+function_opcodes = {'eye': EYE, 'zeros': ZEROS, 'ones': ONES}
+
+# position of the jump target in the argument, None when the argument is the target
+jump_args = {
+    FOR_ITER: None, JUMP: None, JUMP_IF_FALSE: None,
+    FOR_ITER_ASSIGN: 0, NAME_CONST_BINARY_JUMP: 3, NAME_NAME_BINARY_JUMP: 3,
+}
+
+# position of the binary operator opcode in the argument of a superinstruction
+binary_args = dict.fromkeys((NAME_CONST_BINARY, NAME_NAME_BINARY, NAME_CONST_BINARY_ASSIGN,
+                             NAME_NAME_BINARY_ASSIGN, NAME_CONST_BINARY_JUMP, NAME_NAME_BINARY_JUMP), 2)
+
+MAGIC = b'MBC4'  # changes whenever the instruction set does
+
+
+def jump_target(opcode, arg):
+    index = jump_args[opcode]
+    return arg if index is None else arg[index]
+
+
+def retarget(opcode, arg, target):
+    index = jump_args[opcode]
+    return target if index is None else arg[:index] + (target,) + arg[index + 1:]
+
+
+class Code(object):
+
+    def __init__(self):
+        self.instructions = []  # (opcode, argument) pairs
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def emit(self, opcode, arg=None):
+        self.instructions.append((opcode, arg))
+        return len(self.instructions) - 1
+
+    def patch(self, index, arg):
+        self.instructions[index] = self.instructions[index][0], arg
+
+    def disassemble(self):
+        targets = {jump_target(opcode, arg) for opcode, arg in self.instructions if opcode in jump_args}
+        return '\n'.join('{:>2} {:>5} {:<24} {}'.format('>>' if pc in targets else '', pc, opnames[opcode],
+                                                        '' if arg is None else self.show(opcode, arg))
+                         for pc, (opcode, arg) in enumerate(self.instructions))
+
+    @staticmethod
+    def show(opcode, arg):
+        if opcode in binary_args:
+            index = binary_args[opcode]
+            return '({})'.format(', '.join(opnames[x] if i == index else repr(x) for i, x in enumerate(arg)))
+        return repr(arg)
+
+
+def cache_path(filename):
+    return os.path.splitext(filename)[0] + '.mbc'
+
+
+def load(filename, source):  # compiled code of <source> cached next to <filename>, None when missing or stale
+    try:
+        with open(cache_path(filename), 'rb') as file:
+            magic, cached, code = pickle.load(file)
+    except (OSError, EOFError, ValueError, AttributeError, ImportError, pickle.UnpicklingError):
+        return None
+    return code if magic == MAGIC and cached == source else None
+
+
+def save(filename, source, code):
+    try:
+        with open(cache_path(filename), 'wb') as file:
+            pickle.dump((MAGIC, source, code), file)
+    except OSError:
+        pass
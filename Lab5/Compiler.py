@@ -0,0 +1,189 @@
+
+import AST
+from Bytecode import *
+from MatrixValue import MatrixValue
+from visit import *
+
+
+class Compiler(object):
+
+    def __init__(self):
+        self.code = Code()
+        self.loops = []  # continue target and break jumps to patch, for every enclosing loop
+        self.unchecked = frozenset()  # accesses proven in bounds, compiled without the check
+
+    def compile(self, node):
+        node.accept(self)
+        self.code.emit(LOAD_CONST, None)
+        self.code.emit(RETURN)
+        return self.code
+
+    def emit(self, opcode, arg=None):
+        return self.code.emit(opcode, arg)
+
+    def loop(self, start, body):
+        self.loops.append((start, []))
+        body.accept(self)
+        self.emit(JUMP, start)
+        return self.loops.pop()[1]
+
+    @on('node')
+    def visit(self, node):
+        pass
+
+    @when(AST.Program)
+    def visit(self, node):
+        self.unchecked = node.unchecked
+        node.program.accept(self)
+
+    @when(AST.Block)
+    def visit(self, node):
+        for instruction in node.instructions:
+            instruction.accept(self)
+
+    @when(AST.Instruction)
+    def visit(self, node):
+        node.line.accept(self)
+
+    @when(AST.Error)
+    def visit(self, node):
+        pass
+
+    @when(AST.Value)
+    def visit(self, node):
+        value = node.primitive
+        if isinstance(value, AST.Node):
+            value.accept(self)
+        else:
+            self.emit(LOAD_CONST, value[1:-1] if isinstance(value, str) else value)
+
+    @when(AST.Variable)
+    def visit(self, node):
+        self.emit(LOAD_NAME, node.name)
+
+    @when(AST.Sequence)
+    def visit(self, node):
+        for expression in node.expressions:
+            expression.accept(self)
+
+    @when(AST.Matrix)
+    def visit(self, node):
+        for row in node.rows.row_list:
+            row.accept(self)
+        self.emit(BUILD_MATRIX, tuple(map(len, node.rows.row_list)))
+
+    @when(AST.ConstantMatrix)
+    def visit(self, node):
+        self.emit(LOAD_MATRIX, MatrixValue(node.dims, node.data))
+
+    @when(AST.Access)
+    def visit(self, node):
+        node.key.accept(self)
+        self.emit(LOAD_ELEMENT_UNCHECKED if node in self.unchecked else LOAD_ELEMENT, (node.variable, len(node.key)))
+
+    @when(AST.Function)
+    def visit(self, node):
+        node.argument.accept(self)
+        self.emit(function_opcodes[node.name], len(node.argument))
+
+    @when(AST.BinaryExpression)
+    def visit(self, node):
+        node.left.accept(self)
+        node.right.accept(self)
+        self.emit(binary_opcodes[node.operator])
+
+    @when(AST.Negation)
+    def visit(self, node):
+        node.operand.accept(self)
+        self.emit(UMINUS)
+
+    @when(AST.Transposition)
+    def visit(self, node):
+        node.operand.accept(self)
+        self.emit(TRANSPOSE)
+
+    @when(AST.Assignment)
+    def visit(self, node):
+        target = node.left.name
+        if isinstance(target, AST.Access):
+            element = target.variable, len(target.key)
+            unchecked = target in self.unchecked
+            target.key.accept(self)
+            if node.operator != '=':
+                target.key.accept(self)
+                self.emit(LOAD_ELEMENT_UNCHECKED if unchecked else LOAD_ELEMENT, element)
+            node.right.accept(self)
+            if node.operator != '=':
+                self.emit(binary_opcodes[node.operator[0]])
+            self.emit(STORE_ELEMENT_UNCHECKED if unchecked else STORE_ELEMENT, element)
+        else:
+            node.right.accept(self)
+            self.emit(ASSIGN if node.operator == '=' else assignment_opcodes[node.operator], target)
+
+    @when(AST.Print)
+    def visit(self, node):
+        node.expression.accept(self)
+        self.emit(PRINT, len(node.expression))
+
+    @when(AST.If)
+    def visit(self, node):
+        node.condition.accept(self)
+        jump = self.emit(JUMP_IF_FALSE)
+        node.expression.accept(self)
+        if node.else_expression is not None:
+            end = self.emit(JUMP)
+            self.code.patch(jump, len(self.code))
+            node.else_expression.accept(self)
+            jump = end
+        self.code.patch(jump, len(self.code))
+
+    #     condition              loop: FOR_ITER exit
+    #     JUMP_IF_FALSE exit           ASSIGN id
+    #     body                         body
+    #     JUMP condition               JUMP loop
+    # exit:                            POP            <- break
+    #                            exit:
+
+    @when(AST.While)
+    def visit(self, node):
+        start = len(self.code)
+        node.condition.accept(self)
+        breaks = [self.emit(JUMP_IF_FALSE)] + self.loop(start, node.body)
+        for jump in breaks:
+            self.code.patch(jump, len(self.code))
+
+    @when(AST.Range)
+    def visit(self, node):
+        node.start.accept(self)
+        node.end.accept(self)
+        if isinstance(node.step, AST.Node):
+            node.step.accept(self)
+        self.emit(RANGE, isinstance(node.step, AST.Node))
+
+    @when(AST.For)
+    def visit(self, node):
+        node.range.accept(self)
+        start = self.emit(FOR_ITER)
+        self.emit(ASSIGN, node.id)
+        breaks = self.loop(start, node.body)
+        for jump in breaks:
+            self.code.patch(jump, len(self.code))
+        self.emit(POP)
+        self.code.patch(start, len(self.code))
+
+    @when(AST.Break)
+    def visit(self, node):
+        if not self.loops:
+            raise SyntaxError("'break' outside loop")
+        self.loops[-1][1].append(self.emit(JUMP))
+
+    @when(AST.Continue)
+    def visit(self, node):
+        if not self.loops:
+            raise SyntaxError("'continue' outside loop")
+        self.emit(JUMP, self.loops[-1][0])
+
+    @when(AST.Return)
+    def visit(self, node):
+        node.result.accept(self)
+        self.emit(RETURN)
@@ -0,0 +1,205 @@
+import AST
+from TypeChecker import TypeChecker, is_matrix
+from Operations import binary_operations
+from Rewrite import walk, rebuild, block, statements, used
+
+# Dead code elimination. Going forward through a block, an if or while
+# whose condition is made of literals only is replaced by the branch it
+# always takes, and whatever follows a break, continue or return, or an
+# if both of whose branches end so, is dropped. Going backward, the
+# variables still to be read are tracked and an assignment to one that
+# is not is removed when its right side is pure: no element access, no
+# division, no zeros, ones or eye of a computed size, no matrix
+# operation on a shape the type checker does not know and no variable
+# which some path leaves unassigned, so that nothing removed could have
+# failed. Loops are iterated until what their head needs stops growing.
+# Loops and ifs left without a body go as well.
+
+
+def constant(node):  # value of an expression of literals, None for any other
+    if type(node) is AST.Value and not isinstance(node.primitive, AST.Node):
+        return node.primitive[1:-1] if isinstance(node.primitive, str) else node.primitive
+    if isinstance(node, AST.Negation):
+        value = constant(node.operand)
+        return None if value is None or isinstance(value, str) else -value
+    if isinstance(node, AST.BinaryExpression) and not isinstance(node, AST.Assignment):
+        left, right = constant(node.left), constant(node.right)
+        if left is None or right is None:
+            return None
+        try:
+            return binary_operations[node.operator](left, right)
+        except (TypeError, ZeroDivisionError):
+            return None
+    return None
+
+
+def terminates(statement):  # whether nothing after <statement> in its block runs
+    if isinstance(statement, AST.Instruction):
+        return terminates(statement.line)
+    if isinstance(statement, (AST.Break, AST.Continue, AST.Return)):
+        return True
+    if isinstance(statement, AST.If):
+        return statement.else_expression is not None and all(
+            any(map(terminates, statements(body))) for body in statement.children[1:])
+    if isinstance(statement, AST.Block):
+        return any(map(terminates, statement.instructions))
+    return False
+
+
+def same(instructions, others):
+    return len(instructions) == len(others) and all(a is b for a, b in zip(instructions, others))
+
+
+class DeadCode(object):
+
+    def __init__(self):
+        self.report = []  # (line, message) of every removal
+        self.types = {}  # node -> type, from the type checker
+        self.defined = {}  # statement -> the variables assigned on every path that reaches it
+
+    def optimize(self, program):
+        self.types, self.defined = {}, {}
+        TypeChecker(types=self.types).visit(program)
+        instructions = program.program.instructions
+        self.assigned(instructions, frozenset())
+        result, _ = self.block(instructions, set(), None)
+        self.report.sort(key=lambda entry: entry[0])
+        return program if same(result, instructions) else AST.Program(block(result, program.program.lineno))
+
+    def safe(self, operator, left, right):  # whether <operator> on values of these types cannot fail
+        if operator in ('/', './') or left is None or right is None:
+            return False
+        return all(not is_matrix(type) or type.shape is not None for type in (left, right))
+
+    def pure(self, node, statement):  # whether evaluating <node> in <statement> cannot fail
+        defined = self.defined.get(statement, frozenset())
+        for node in walk(node):
+            if isinstance(node, AST.Access) or isinstance(node, AST.Variable) and node.name not in defined:
+                return False
+            if isinstance(node, AST.Function) and any(
+                    type(expression) is not AST.Value for expression in node.argument.expressions):
+                return False
+            if isinstance(node, AST.BinaryExpression) and not self.safe(
+                    node.operator, self.types.get(node.left), self.types.get(node.right)):
+                return False
+        return True
+
+    def assigned(self, instructions, defined):  # what is assigned on every path through <instructions>
+        for statement in instructions:
+            node = statement.line if isinstance(statement, AST.Instruction) else statement
+            self.defined[node] = self.defined[node] & defined if node in self.defined else defined
+            if isinstance(node, AST.Assignment) and not isinstance(node.left.name, AST.Access):
+                defined = defined | {node.left.name}
+            elif isinstance(node, AST.Block):
+                defined = self.assigned(node.instructions, defined)
+            elif isinstance(node, AST.If):
+                branches = [self.assigned(statements(body), defined) for body in node.children[1:]]
+                if node.else_expression is not None:
+                    defined = branches[0] & branches[1]
+            elif isinstance(node, (AST.While, AST.For)):  # the body may not run at all
+                self.assigned(statements(node.body), defined | {node.id} if isinstance(node, AST.For) else defined)
+        return defined
+
+    def reachable(self, instructions):  # <instructions> with constant conditions folded, up to the first that ends the block
+        result, pending = [], list(reversed(instructions))
+        while pending:
+            statement = pending.pop()
+            value = constant(statement.condition) if isinstance(statement, (AST.If, AST.While)) else None
+            if isinstance(statement, AST.If) and value is not None:
+                taken = statement.expression if value else statement.else_expression
+                self.report.append((statement.lineno, 'if condition always {}, {}'.format(
+                    'true' if value else 'false', 'removed' if taken is None else 'branch inlined')))
+                if taken is not None:
+                    pending += reversed(statements(taken))
+                continue
+            if isinstance(statement, AST.While) and value is not None and not value:
+                self.report.append((statement.lineno, 'while condition always false, removed'))
+                continue
+            result.append(statement)
+            if terminates(statement) and pending:
+                self.report.append((pending[-1].lineno, '{} unreachable instructions removed'.format(len(pending))))
+                break
+        return result
+
+    def block(self, instructions, live, loop):  # new instructions and the variables read before assigned
+        # <live> is what is read after the block, <loop> what is read after a break and after a continue
+        result = []
+        for statement in reversed(self.reachable(instructions)):
+            statement, live = self.statement(statement, live, loop)
+            if statement is not None:
+                result.append(statement)
+        result.reverse()
+        return result, live
+
+    def body(self, body, live, loop):
+        instructions = statements(body)
+        result, live = self.block(instructions, live, loop)
+        if same(result, instructions):
+            return body, live
+        instruction = AST.Instruction(block(result, body.lineno))
+        instruction.lineno = body.lineno
+        return instruction, live
+
+    def statement(self, statement, live, loop):  # <statement> or None when it is dead, and what it reads
+        node = statement.line if isinstance(statement, AST.Instruction) else statement
+        if isinstance(node, AST.Assignment):
+            return self.assignment(statement, node, live)
+        if isinstance(node, AST.Print):
+            return statement, live | used(node.expression)
+        if isinstance(node, AST.Return):
+            return statement, used(node.result)
+        if isinstance(node, AST.Break):
+            return statement, set(loop[0])
+        if isinstance(node, AST.Continue):
+            return statement, set(loop[1])
+        if isinstance(node, AST.Block):
+            result, live = self.block(node.instructions, live, loop)
+            if not result:
+                return None, live
+            return (node if same(result, node.instructions) else block(result, node.lineno)), live
+        if isinstance(node, AST.If):
+            return self.branches(node, live, loop)
+        if isinstance(node, (AST.While, AST.For)):
+            return self.loop(node, live)
+        return statement, live
+
+    def assignment(self, statement, node, live):
+        target = node.left.name
+        if isinstance(target, AST.Access):
+            return statement, live | {target.variable} | used(target.key) | used(node.right)
+        if target not in live and self.pure(node.right, node) and (node.operator == '=' or self.pure(
+                node.left, node) and self.safe(node.operator[0], self.types.get(node.left), self.types.get(node.right))):
+            self.report.append((node.lineno, "unused assignment to '{}' removed".format(target)))
+            return None, live
+        if node.operator == '=':
+            return statement, live - {target} | used(node.right)
+        return statement, live | {target} | used(node.right)
+
+    def branches(self, node, live, loop):
+        parts = [self.body(body, live, loop) for body in node.children[1:]]
+        after = set().union(*[part[1] for part in parts]) | (live if node.else_expression is None else set())
+        if all(not statements(body) for body, _ in parts) and self.pure(node.condition, node):
+            self.report.append((node.lineno, 'empty if removed'))
+            return None, live
+        bodies = {id(old): new for old, (new, _) in zip(node.children[1:], parts)}
+        result = rebuild(node, lambda child: bodies.get(id(child)) if child is not node else None)
+        return result, after | used(node.condition)
+
+    def loop(self, node, live):
+        condition = used(node.condition) if isinstance(node, AST.While) else set()
+        head = live | condition
+        mark = len(self.report)
+        while True:  # what the head needs only grows, the variables are finite
+            del self.report[mark:]
+            body, inside = self.body(node.body, head, (live, head))
+            if isinstance(node, AST.For):
+                inside = inside - {node.id}
+            grown = head | inside
+            if grown == head:
+                break
+            head = grown
+        if isinstance(node, AST.For) and not statements(body) and node.id not in live and self.pure(node.range, node):
+            self.report.append((node.lineno, 'empty for loop removed'))
+            return None, live
+        result = node if body is node.body else rebuild(node, lambda child: body if child is node.body else None)
+        return result, head | (used(node.range) if isinstance(node, AST.For) else set())
@@ -9,3 +9,6 @@ class BreakException(Exception):
 
 class ContinueException(Exception):
     pass
+
+# errors a running script may raise, reported as "Error: <message>" by main.py and repl.py
+runtime_errors = (NameError, IndexError, ValueError, TypeError, ZeroDivisionError, OverflowError)
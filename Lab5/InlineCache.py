@@ -0,0 +1,38 @@
+
+scalars = (int, float, bool, str)
+
+
+def resolve(operation, left, right):  # implementation of <operation> for operands of types <left> and <right>
+    if left in scalars and right in scalars:
+        return getattr(operation, 'op', operation)
+    return operation
+
+
+class InlineCache(object):  # operand types last seen at one BinaryExpression and their implementation
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.left = self.right = None
+        self.implementation = operation
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, left, right):
+        if type(left) is self.left and type(right) is self.right:
+            self.hits += 1
+            return self.implementation(left, right)
+        return self.miss(left, right)
+
+    def miss(self, left, right):
+        self.misses += 1
+        self.left, self.right = type(left), type(right)
+        self.implementation = resolve(self.operation, self.left, self.right)
+        return self.implementation(left, right)
+
+
+def report(caches):  # hit rate over every call site, monomorphic sites never saw a second type pair
+    hits = sum(cache.hits for cache in caches)
+    misses = sum(cache.misses for cache in caches)
+    monomorphic = sum(cache.misses == 1 for cache in caches)
+    return 'inline caches: {} sites, {} monomorphic, {} hits, {} misses, {:.1%} hit rate'.format(
+        len(caches), monomorphic, hits, misses, hits / (hits + misses) if hits + misses else 0)
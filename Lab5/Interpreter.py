@@ -1,40 +1,180 @@
 
 import AST
-import SymbolTable
 from Memory import *
 from Exceptions import  *
+from MatrixValue import MatrixValue
+from LazyMatrix import force
+from Operations import *
+from InlineCache import InlineCache
 from visit import *
 import sys
 
 sys.setrecursionlimit(10000)
 
+
 class Interpreter(object):
 
+    binary_operations = binary_operations
+    assignment_operations = assignment_operations
+    functions = functions
+
+    def __init__(self):
+        self.memory = MemoryStack()
+        self.constants = {}  # ConstantMatrix -> MatrixValue shared by every evaluation
+        self.caches = {}  # BinaryExpression -> InlineCache
+        self.unchecked = frozenset()  # accesses proven in bounds, of the running program
 
     @on('node')
     def visit(self, node):
         pass
 
-    @when(AST.BinOp)
+    @when(AST.Program)
+    def visit(self, node):
+        self.unchecked = node.unchecked
+        try:
+            return node.program.accept(self)
+        except ReturnValueException as e:
+            return e.value
+
+    @when(AST.Block)
+    def visit(self, node):
+        for instruction in node.instructions:
+            instruction.accept(self)
+
+    @when(AST.Instruction)
+    def visit(self, node):
+        return node.line.accept(self)
+
+    @when(AST.Error)
+    def visit(self, node):
+        pass
+
+    @when(AST.Value)
     def visit(self, node):
+        value = node.primitive
+        if isinstance(value, AST.Node):
+            return value.accept(self)
+        if isinstance(value, str):
+            return value[1:-1]
+        return value
+
+    @when(AST.Variable)
+    def visit(self, node):
+        return self.memory.get(node.name)
+
+    @when(AST.Sequence)
+    def visit(self, node):
+        return [expression.accept(self) for expression in node.expressions]
+
+    @when(AST.Rows)
+    def visit(self, node):
+        return [row.accept(self) for row in node.row_list]
+
+    @when(AST.Matrix)
+    def visit(self, node):
+        return MatrixValue.from_rows(node.rows.accept(self))
+
+    @when(AST.ConstantMatrix)
+    def visit(self, node):
+        if node not in self.constants:
+            self.constants[node] = MatrixValue(node.dims, node.data)
+        return self.constants[node].share()
+
+    @when(AST.Access)
+    def visit(self, node):
+        if node in self.unchecked:
+            return self.memory.get(node.variable).get(node.key.accept(self))
+        return self.memory.get(node.variable)[tuple(node.key.accept(self))]
+
+    @when(AST.Function)
+    def visit(self, node):
+        return self.functions[node.name](*node.argument.accept(self))
+
+    @when(AST.BinaryExpression)
+    def visit(self, node):
+        cache = self.caches.get(node)
+        if cache is None:
+            cache = self.caches[node] = InlineCache(self.binary_operations[node.operator])
         r1 = node.left.accept(self)
         r2 = node.right.accept(self)
-        # try sth smarter than:
-        # if(node.op=='+') return r1+r2
-        # elsif(node.op=='-') ...
-        # but do not use python eval
+        return cache(r1, r2)
+
+    @when(AST.Negation)
+    def visit(self, node):
+        return negate(node.operand.accept(self))
+
+    @when(AST.Transposition)
+    def visit(self, node):
+        return transpose(node.operand.accept(self))
 
     @when(AST.Assignment)
     def visit(self, node):
-    #
-    #
+        value = force(node.right.accept(self))
+        target = node.left.name
+        if isinstance(target, AST.Access):
+            matrix = self.memory.get(target.variable)
+            key = tuple(target.key.accept(self))
+            if target in self.unchecked:
+                if node.operator != '=':
+                    value = self.assignment_operations[node.operator](matrix.get(key), value)
+                matrix.put(key, value)
+                return
+            if node.operator != '=':
+                value = self.assignment_operations[node.operator](matrix[key], value)
+            matrix[key] = value
+        elif node.operator == '=':
+            self.memory.set(target, value.share() if isinstance(value, MatrixValue) else value)
+        else:
+            current = self.memory.get(target)
+            self.memory.set(target, self.assignment_operations[node.operator](current, value))
 
-    # simplistic while loop interpretation
-    @when(AST.WhileInstr)
+    @when(AST.Print)
     def visit(self, node):
-        r = None
-        while node.cond.accept(self):
-            r = node.body.accept(self)
-        return r
+        print(*map(force, node.expression.accept(self)))
 
+    @when(AST.If)
+    def visit(self, node):
+        if node.condition.accept(self):
+            return node.expression.accept(self)
+        elif node.else_expression is not None:
+            return node.else_expression.accept(self)
 
+    @when(AST.While)
+    def visit(self, node):
+        while node.condition.accept(self):
+            try:
+                node.body.accept(self)
+            except BreakException:
+                break
+            except ContinueException:
+                pass
+
+    @when(AST.Range)
+    def visit(self, node):
+        start = node.start.accept(self)
+        end = node.end.accept(self)
+        step = node.step.accept(self) if isinstance(node.step, AST.Node) else node.step
+        return inclusive_range(start, end, step)
+
+    @when(AST.For)
+    def visit(self, node):
+        for i in node.range.accept(self):
+            self.memory.set(node.id, i)
+            try:
+                node.body.accept(self)
+            except BreakException:
+                break
+            except ContinueException:
+                pass
+
+    @when(AST.Break)
+    def visit(self, node):
+        raise BreakException()
+
+    @when(AST.Continue)
+    def visit(self, node):
+        raise ContinueException()
+
+    @when(AST.Return)
+    def visit(self, node):
+        raise ReturnValueException(force(node.result.accept(self)))
@@ -0,0 +1,60 @@
+from itertools import repeat
+from numbers import Number
+
+from MatrixValue import MatrixValue, buffer
+
+
+class LazyMatrix(object):  # deferred element-wise expression over dense matrices
+
+    def __init__(self, shape, op, operands):
+        self.shape = shape
+        self.op = op
+        self.operands = operands
+
+    @staticmethod
+    def fusable(*values):
+        matrices = [isinstance(value, LazyMatrix) or type(value) is MatrixValue for value in values]
+        return any(matrices) and all(matrix or isinstance(value, Number) for matrix, value in zip(matrices, values))
+
+    @classmethod
+    def apply(cls, op, *values):
+        shapes = [value.shape for value in values if hasattr(value, 'shape')]
+        if len(set(shapes)) > 1:
+            raise ValueError('incompatible dimensions {}x{} and {}x{}'.format(*(shapes[0] + shapes[1])))
+        return cls(shapes[0], op, [lazy(value) for value in values])
+
+    def transpose(self):
+        rows, cols = self.shape
+        return LazyMatrix((cols, rows), self.op, [operand.transpose() if isinstance(operand, LazyMatrix) else operand
+                                                  for operand in self.operands])
+
+    def values(self):  # row-major iterator computing every element in a single pass
+        return map(self.op, *[operand.values() if isinstance(operand, LazyMatrix) else repeat(operand)
+                              for operand in self.operands])
+
+    def evaluate(self):
+        return MatrixValue(self.shape, buffer(self.values()))
+
+
+class LazyLeaf(LazyMatrix):
+
+    def __init__(self, matrix):
+        super().__init__(matrix.shape, None, [matrix])
+        self.matrix = matrix
+
+    def transpose(self):
+        return LazyLeaf(self.matrix.transpose())
+
+    def values(self):
+        return self.matrix.values()
+
+    def evaluate(self):
+        return self.matrix
+
+
+def lazy(value):
+    return LazyLeaf(value) if type(value) is MatrixValue else value
+
+
+def force(value):
+    return value.evaluate() if isinstance(value, LazyMatrix) else value
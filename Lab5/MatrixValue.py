@@ -0,0 +1,409 @@
+from array import array
+from copy import copy
+from itertools import chain, repeat
+from operator import eq, mul
+import sys
+
+try:
+    from math import sumprod as dot
+except ImportError:
+    def dot(x, y):
+        return sum(map(mul, x, y))
+
+
+def buffer(values):  # packs elements into machine integers, or doubles if they are not all integers
+    if isinstance(values, array):
+        return values
+    values = values if isinstance(values, list) else list(values)
+    try:
+        return array('q', values)
+    except (TypeError, OverflowError):
+        return array('d', values)
+
+
+def doubles(values):
+    return values if isinstance(values, array) and values.typecode == 'd' else array('d', values)
+
+
+def blocked_matmul(a, bt, n, m, p, block):  # row-major (n x m) times transposed (p x m) into a flat array
+    # of machine integers when both operands are integers and no element overflows, of doubles otherwise
+    a, bt = buffer(a), buffer(bt)
+    typecode = 'q' if a.typecode == bt.typecode == 'q' else 'd'
+    a, bt = (a, bt) if typecode == 'q' else (doubles(a), doubles(bt))
+    rows = [memoryview(a)[i * m:(i + 1) * m] for i in range(n)]
+    cols = [memoryview(bt)[j * m:(j + 1) * m] for j in range(p)]
+    result = array(typecode, bytes(8 * n * p))
+    try:
+        for j in range(0, p, block):  # a tile of columns is unboxed once and reused by every row
+            tile = [col.tolist() for col in cols[j:j + block]]
+            for i, row in enumerate(rows):
+                result[i * p + j:i * p + j + len(tile)] = array(typecode, [dot(row, col) for col in tile])
+    except OverflowError:
+        return blocked_matmul(doubles(a), doubles(bt), n, m, p, block)
+    return result
+
+
+class Storage(object):
+
+    def __init__(self, data):
+        self.data = data    # flat array of elements, read by views through their strides
+        self.owners = 1     # number of MatrixValues sharing this storage
+
+
+class MatrixValue(object):
+
+    block_size = 64  # columns per tile of matrix multiplication, see benchmarks/matmul.py
+
+    def __init__(self, shape, data, start=0, strides=None):
+        self.shape = shape
+        self.start = start
+        self.strides = strides or (shape[1], 1)
+        self.storage = data if isinstance(data, Storage) else Storage(data)
+
+    def __del__(self):
+        self.storage.owners -= 1
+
+    @classmethod
+    def filled(cls, rows, cols, value):
+        return cls((rows, cols), buffer([value]) * (rows * cols))
+
+    @classmethod
+    def zeros(cls, rows, cols=None):
+        return cls.filled(rows, rows if cols is None else cols, 0)
+
+    @classmethod
+    def ones(cls, rows, cols=None):
+        return cls.filled(rows, rows if cols is None else cols, 1)
+
+    @classmethod
+    def eye(cls, rows, cols=None):
+        matrix = cls.zeros(rows, cols)
+        cols = matrix.shape[1]
+        for i in range(min(rows, cols)):
+            matrix.data[i * cols + i] = 1
+        return matrix
+
+    @classmethod
+    def from_rows(cls, rows):
+        if len(set(map(len, rows))) > 1:
+            raise ValueError('matrix rows have different lengths')
+        return cls((len(rows), len(rows[0]) if rows else 0), buffer([x for row in rows for x in row]))
+
+    @property
+    def data(self):
+        return self.storage.data
+
+    @property
+    def contiguous(self):
+        rows, cols = self.shape
+        return self.start == 0 and self.strides == (cols, 1) and len(self.data) == rows * cols
+
+    def view(self, shape, start, strides):  # shares the storage, which is copied on the first write
+        self.storage.owners += 1
+        return type(self)(shape, self.storage, start, strides)
+
+    def share(self):
+        return self.view(self.shape, self.start, self.strides)
+
+    def transpose(self):
+        rows, cols = self.shape
+        return self.view((cols, rows), self.start, self.strides[::-1])
+
+    def row(self, i):
+        return self.view((1, self.shape[1]), self.start + (i - 1) * self.strides[0], self.strides)
+
+    def column(self, j):
+        return self.view((self.shape[0], 1), self.start + (j - 1) * self.strides[1], self.strides)
+
+    def values(self):  # elements in row-major order
+        if self.contiguous:
+            return iter(self.data)
+        rows, cols = self.shape
+        (s0, s1), data = self.strides, self.data
+        return chain.from_iterable(data[self.start + i * s0:self.start + i * s0 + (cols - 1) * s1 + 1:s1]
+                                   for i in range(rows))
+
+    def packed(self):  # contiguous copy of the elements
+        return copy(self.data) if self.contiguous else array(self.data.typecode, self.values())
+
+    def flat(self):
+        return self.data if self.contiguous else self.packed()
+
+    def copy(self):
+        return type(self)(self.shape, self.packed())
+
+    def own(self, data=None):  # detaches from shared storage before mutating it, or replaces it with <data>
+        if data is None and self.storage.owners > 1:
+            data = self.packed()
+        if data is not None:
+            self.storage.owners -= 1
+            self.storage = Storage(data)
+            self.start, self.strides = 0, (self.shape[1], 1)
+
+    def offset(self, key):
+        rows, cols = self.shape
+        if not isinstance(key, tuple):
+            key = key,
+        if len(key) == 1 and 1 <= key[0] <= rows * cols:
+            key = divmod(key[0] - 1, cols)
+        elif len(key) == 2 and 1 <= key[0] <= rows and 1 <= key[1] <= cols:
+            key = key[0] - 1, key[1] - 1
+        else:
+            raise IndexError('index {} out of bounds for {}x{} matrix'.format(key, rows, cols))
+        return self.start + key[0] * self.strides[0] + key[1] * self.strides[1]
+
+    def position(self, key):  # offset of a key of one or two indices known to be in bounds, see Shapes.py
+        if len(key) == 1:
+            i, j = divmod(key[0] - 1, self.shape[1])
+        else:
+            i, j = key[0] - 1, key[1] - 1
+        return self.start + i * self.strides[0] + j * self.strides[1]
+
+    def __getitem__(self, key):
+        return self.data[self.offset(key)]
+
+    def __setitem__(self, key, value):
+        self.offset(key)
+        self.put(key if isinstance(key, tuple) else (key,), value)
+
+    def get(self, key):  # self[key] without the bounds check
+        return self.data[self.position(key)]
+
+    def put(self, key, value):
+        self.own()
+        offset = self.position(key)
+        try:
+            self.data[offset] = value
+        except TypeError:  # a float stored into integers
+            self.own(array('d', self.values()))  # in the order of the view, not of the storage
+            self.data[self.position(key)] = value
+
+    def equals(self, other):  # same shape and elements, what == means for matrices
+        return isinstance(other, MatrixValue) and self.shape == other.shape and all(map(eq, self.values(), other.values()))
+
+    def check_dims(self, other):
+        if self.shape != other.shape:
+            raise ValueError('incompatible dimensions {}x{} and {}x{}'.format(*(self.shape + other.shape)))
+
+    def elementwise(self, op, other, reflected=False):
+        if isinstance(other, MatrixValue):
+            self.check_dims(other)
+            pairs = zip(self.values(), other.values())
+        elif reflected:
+            pairs = zip(repeat(other), self.values())
+        else:
+            pairs = zip(self.values(), repeat(other))
+        return MatrixValue(self.shape, buffer([op(a, b) for a, b in pairs]))
+
+    def ielementwise(self, op, other):
+        if isinstance(other, MatrixValue):
+            self.check_dims(other)
+            values = other.values()
+        else:
+            values = repeat(other)
+        self.own(buffer(map(op, self.values(), values)))
+        return self
+
+    def matmul(self, other):
+        (n, m), (k, p) = self.shape, other.shape
+        if m != k:
+            raise ValueError('cannot multiply {}x{} and {}x{} matrices'.format(n, m, k, p))
+        if isinstance(other, SparseMatrixValue):
+            a, data = self.flat(), [0] * (n * p)
+            for key, x in other.data.items():
+                k, j = divmod(key, p)
+                for i in range(n):
+                    data[i * p + j] += a[i * m + k] * x
+            return MatrixValue((n, p), buffer(data))
+        return MatrixValue((n, p), blocked_matmul(self.flat(), other.transpose().values(), n, m, p, self.block_size))
+
+    def __add__(self, other):
+        return self.elementwise(lambda a, b: a + b, other)
+
+    def __radd__(self, other):
+        return self.elementwise(lambda a, b: a + b, other, reflected=True)
+
+    def __sub__(self, other):
+        return self.elementwise(lambda a, b: a - b, other)
+
+    def __rsub__(self, other):
+        return self.elementwise(lambda a, b: a - b, other, reflected=True)
+
+    def __mul__(self, other):
+        if isinstance(other, MatrixValue):
+            return self.matmul(other)
+        return self.elementwise(lambda a, b: a * b, other)
+
+    def __rmul__(self, other):
+        return self.elementwise(lambda a, b: a * b, other, reflected=True)
+
+    def __truediv__(self, other):
+        if isinstance(other, MatrixValue):
+            return NotImplemented
+        return self.elementwise(lambda a, b: a / b, other)
+
+    def __neg__(self):
+        return MatrixValue(self.shape, buffer([-x for x in self.values()]))
+
+    def __iadd__(self, other):
+        return self.ielementwise(lambda a, b: a + b, other)
+
+    def __isub__(self, other):
+        return self.ielementwise(lambda a, b: a - b, other)
+
+    def __imul__(self, other):
+        if isinstance(other, MatrixValue):
+            return self.matmul(other)
+        return self.ielementwise(lambda a, b: a * b, other)
+
+    def __itruediv__(self, other):
+        if isinstance(other, MatrixValue):
+            return NotImplemented
+        return self.ielementwise(lambda a, b: a / b, other)
+
+    @property
+    def __array_interface__(self):  # lets numpy.asarray wrap the storage without copying
+        itemsize = self.data.itemsize
+        return {
+            'version': 3,
+            'shape': self.shape,
+            'typestr': ('<' if sys.byteorder == 'little' else '>') + ('f' if self.data.typecode == 'd' else 'i') + str(itemsize),
+            'data': (self.data.buffer_info()[0] + self.start * itemsize, True),
+            'strides': tuple(stride * itemsize for stride in self.strides),
+        }
+
+    def __buffer__(self, flags):  # PEP 688, contiguous matrices are exported without copying
+        return memoryview(self.flat()).cast('B').cast(self.data.typecode, self.shape)
+
+    def __repr__(self):
+        rows, cols = self.shape
+        values = list(self.values())
+        return '[' + '; '.join(', '.join(map(str, values[i * cols:(i + 1) * cols]))  # as scalars print
+                               for i in range(rows)) + ']'
+
+
+def preserves_zero(op, left, right):
+    try:
+        return op(left, right) == 0
+    except ZeroDivisionError:
+        return False
+
+
+class SparseMatrixValue(MatrixValue):  # dictionary of keys, offset -> nonzero element
+
+    density_threshold = 0.1
+
+    @classmethod
+    def filled(cls, rows, cols, value):
+        if value != 0:
+            return MatrixValue.filled(rows, cols, value)
+        return cls((rows, cols), {})
+
+    @classmethod
+    def from_dict(cls, shape, data):  # sparse unless the result is too dense
+        data = {key: x for key, x in data.items() if x != 0}
+        if len(data) > cls.density_threshold * shape[0] * shape[1]:
+            return cls(shape, data).dense()
+        return cls(shape, data)
+
+    def elements(self):  # every element in row-major order, zeros included
+        rows, cols = self.shape
+        data = [0] * (rows * cols)
+        for key, x in self.data.items():
+            data[key] = x
+        return data
+
+    def dense(self):
+        return MatrixValue(self.shape, buffer(self.elements()))
+
+    def densify(self):  # turns this very object dense, so every variable holding it sees a dense matrix
+        self.own(buffer(self.elements()))
+        self.__class__ = MatrixValue
+
+    def values(self):
+        return self.dense().values()
+
+    def packed(self):
+        return copy(self.data)
+
+    def __getitem__(self, key):
+        return self.data.get(self.offset(key), 0)
+
+    def get(self, key):
+        return self.data.get(self.position(key), 0)
+
+    def put(self, key, value):
+        offset = self.position(key)
+        self.own()
+        if value != 0:
+            self.data[offset] = value
+            if len(self.data) > self.density_threshold * self.shape[0] * self.shape[1]:
+                self.densify()
+        else:
+            self.data.pop(offset, None)
+
+    def elementwise(self, op, other, reflected=False):
+        a = self.data
+        if isinstance(other, SparseMatrixValue):
+            self.check_dims(other)
+            b = other.data
+            if preserves_zero(op, 0, 0):
+                return self.from_dict(self.shape, {key: op(a.get(key, 0), b.get(key, 0)) for key in a.keys() | b.keys()})
+        elif not isinstance(other, MatrixValue):
+            if reflected and preserves_zero(op, other, 0):
+                return self.from_dict(self.shape, {key: op(other, x) for key, x in a.items()})
+            if not reflected and preserves_zero(op, 0, other):
+                return self.from_dict(self.shape, {key: op(x, other) for key, x in a.items()})
+        return self.dense().elementwise(op, other, reflected)
+
+    def ielementwise(self, op, other):
+        return self.elementwise(op, other)
+
+    def matmul(self, other):
+        (n, m), (k, p) = self.shape, other.shape
+        if m != k:
+            raise ValueError('cannot multiply {}x{} and {}x{} matrices'.format(n, m, k, p))
+        if isinstance(other, SparseMatrixValue):
+            rows = {}
+            for key, x in other.data.items():
+                k, j = divmod(key, p)
+                rows.setdefault(k, []).append((j, x))
+            data = {}
+            for key, x in self.data.items():
+                i, k = divmod(key, m)
+                for j, y in rows.get(k, ()):
+                    data[i * p + j] = data.get(i * p + j, 0) + x * y
+            return self.from_dict((n, p), data)
+        b = other.flat()
+        data = [0] * (n * p)
+        for key, x in self.data.items():
+            i, k = divmod(key, m)
+            for j in range(p):
+                data[i * p + j] += x * b[k * p + j]
+        return MatrixValue((n, p), buffer(data))
+
+    def row(self, i):
+        cols = self.shape[1]
+        start = (i - 1) * cols
+        return SparseMatrixValue((1, cols), {key - start: x for key, x in self.data.items() if start <= key < start + cols})
+
+    def column(self, j):
+        cols = self.shape[1]
+        return SparseMatrixValue((self.shape[0], 1), {key // cols: x for key, x in self.data.items() if key % cols == j - 1})
+
+    def transpose(self):
+        rows, cols = self.shape
+        return SparseMatrixValue((cols, rows), {(key % cols) * rows + key // cols: x for key, x in self.data.items()})
+
+    @property
+    def __array_interface__(self):
+        raise TypeError('a sparse matrix has no array storage, export its dense() copy')
+
+    def __buffer__(self, flags):
+        raise TypeError('a sparse matrix has no array storage, export its dense() copy')
+
+    def __neg__(self):
+        return SparseMatrixValue(self.shape, {key: -x for key, x in self.data.items()})
+
+    def __repr__(self):
+        return repr(self.dense())
@@ -0,0 +1,83 @@
+from MatrixValue import MatrixValue, SparseMatrixValue
+from LazyMatrix import LazyMatrix, lazy, force
+import operator
+
+
+def elementwise(op):
+    def apply(left, right):
+        if LazyMatrix.fusable(left, right):
+            return LazyMatrix.apply(op, left, right)
+        left, right = force(left), force(right)
+        if isinstance(left, MatrixValue):
+            return left.elementwise(op, right)
+        if isinstance(right, MatrixValue):
+            return right.elementwise(op, left, reflected=True)
+        return op(left, right)
+    apply.op = op  # what the inline caches call for scalar operands
+    return apply
+
+
+def strict(op):
+    def apply(left, right):
+        return op(force(left), force(right))
+    apply.op = op
+    return apply
+
+
+def equality(op):  # matrices are equal with the same shape and elements, not only when they are the same value
+    def apply(left, right):
+        left, right = force(left), force(right)
+        if isinstance(left, MatrixValue):
+            return op(True, left.equals(right))
+        if isinstance(right, MatrixValue):
+            return op(True, right.equals(left))
+        return op(left, right)
+    apply.op = op
+    return apply
+
+
+def negate(value):
+    if LazyMatrix.fusable(value):
+        return LazyMatrix.apply(operator.neg, value)
+    return -value
+
+
+def transpose(value):
+    if LazyMatrix.fusable(value):
+        return lazy(value).transpose()
+    return value.transpose() if isinstance(value, MatrixValue) else value
+
+
+def inclusive_range(start, end, step=1):
+    return range(start, end + 1 if step > 0 else end - 1, step)
+
+
+binary_operations = {
+    '+': elementwise(operator.add),
+    '-': elementwise(operator.sub),
+    '*': strict(operator.mul),
+    '/': strict(operator.truediv),
+    '.+': elementwise(operator.add),
+    '.-': elementwise(operator.sub),
+    '.*': elementwise(operator.mul),
+    './': elementwise(operator.truediv),
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': equality(operator.eq),
+    '!=': equality(operator.ne),
+}
+
+assignment_operations = {
+    '+=': operator.iadd,
+    '-=': operator.isub,
+    '*=': operator.imul,
+    '/=': operator.itruediv,
+}
+
+functions = {
+    'zeros': SparseMatrixValue.zeros,
+    'ones': MatrixValue.ones,
+    'eye': SparseMatrixValue.eye,
+}
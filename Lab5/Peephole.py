@@ -0,0 +1,120 @@
+from contextlib import redirect_stdout
+import io
+
+from Bytecode import *
+
+BINARY = 'BINARY'  # matches any binary operator
+
+
+def same_name(window):
+    return window[0][1] == window[1][1]
+
+
+class Peephole(object):
+
+    # every fusion the VM can execute, longest patterns first
+    candidates = [
+        ((LOAD_NAME, LOAD_CONST, BINARY, ASSIGN), NAME_CONST_BINARY_ASSIGN, None),
+        ((LOAD_NAME, LOAD_NAME, BINARY, ASSIGN), NAME_NAME_BINARY_ASSIGN, None),
+        ((LOAD_NAME, LOAD_CONST, BINARY, JUMP_IF_FALSE), NAME_CONST_BINARY_JUMP, None),
+        ((LOAD_NAME, LOAD_NAME, BINARY, JUMP_IF_FALSE), NAME_NAME_BINARY_JUMP, None),
+        ((LOAD_NAME, LOAD_CONST, BINARY), NAME_CONST_BINARY, None),
+        ((LOAD_NAME, LOAD_NAME, BINARY), NAME_NAME_BINARY, None),
+        ((FOR_ITER, ASSIGN), FOR_ITER_ASSIGN, None),
+        ((LOAD_CONST, ASSIGN), CONST_ASSIGN, None),
+        ((ASSIGN, LOAD_NAME), ASSIGN_LOAD, same_name),
+    ]
+
+    # ASSIGN_LOAD saves next to nothing in the benchmarks/superinstructions.py profile
+    default = (NAME_CONST_BINARY_ASSIGN, NAME_NAME_BINARY_ASSIGN, NAME_CONST_BINARY_JUMP, NAME_NAME_BINARY_JUMP,
+               NAME_CONST_BINARY, NAME_NAME_BINARY, FOR_ITER_ASSIGN, CONST_ASSIGN)
+
+    def __init__(self, fusions=default):
+        self.rules = [rule for rule in self.candidates if rule[1] in fusions]
+
+    @staticmethod
+    def matches(pattern, window):
+        return len(window) == len(pattern) and all(
+            opcode <= EQUAL if expected is BINARY else opcode == expected
+            for expected, (opcode, arg) in zip(pattern, window))
+
+    def fuse(self, code):  # yields (pc, rule) for every fused window, rule is None for a kept instruction
+        instructions = code.instructions
+        targets = {jump_target(opcode, arg) for opcode, arg in instructions if opcode in jump_args}
+        pc = 0
+        while pc < len(instructions):
+            for rule in self.rules:
+                pattern, fused, condition = rule
+                window = instructions[pc:pc + len(pattern)]
+                if self.matches(pattern, window) and not targets.intersection(range(pc + 1, pc + len(pattern))) \
+                        and (condition is None or condition(window)):
+                    yield pc, rule
+                    pc += len(pattern)
+                    break
+            else:
+                yield pc, None
+                pc += 1
+
+    def optimize(self, code):
+        instructions = code.instructions
+        result = Code()
+        index = [0] * (len(instructions) + 1)  # new position of every old instruction
+        for pc, rule in self.fuse(code):
+            if rule is None:
+                index[pc] = result.emit(*instructions[pc])
+                continue
+            pattern, fused, condition = rule
+            window = instructions[pc:pc + len(pattern)]
+            arg = tuple(opcode if expected is BINARY else arg for expected, (opcode, arg) in zip(pattern, window))
+            index[pc:pc + len(pattern)] = [result.emit(fused, arg[0] if fused == ASSIGN_LOAD else arg)] * len(pattern)
+        index[len(instructions)] = len(result)
+        for pc, (opcode, arg) in enumerate(result.instructions):
+            if opcode in jump_args:
+                result.instructions[pc] = opcode, retarget(opcode, arg, index[jump_target(opcode, arg)])
+        for pc, (opcode, arg) in enumerate(result.instructions):
+            if opcode in jump_args:
+                result.instructions[pc] = opcode, retarget(opcode, arg, self.thread(result, jump_target(opcode, arg)))
+        return result
+
+    @staticmethod
+    def thread(code, target):  # follows chains of unconditional jumps
+        seen = set()
+        while target < len(code) and code.instructions[target][0] == JUMP and target not in seen:
+            seen.add(target)
+            target = code.instructions[target][1]
+        return target
+
+    # Profile-guided selection: run the code with a COUNT instruction in
+    # front of every instruction, then keep the fusions which save the
+    # most dispatches.
+
+    @staticmethod
+    def profile(code, vm):  # execution count of every instruction, the program output is discarded
+        counts = [0] * len(code)
+        counted = Code()
+        index = []
+        for pc, instruction in enumerate(code.instructions):
+            index.append(counted.emit(COUNT, (counts, pc)))
+            counted.emit(*instruction)
+        index.append(len(counted))
+        for pc, (opcode, arg) in enumerate(counted.instructions):
+            if opcode in jump_args:
+                counted.instructions[pc] = opcode, retarget(opcode, arg, index[jump_target(opcode, arg)])
+        with redirect_stdout(io.StringIO()):
+            vm.run(counted)
+        return counts
+
+    @classmethod
+    def savings(cls, code, counts):  # dispatches saved by every candidate fusion when used alone
+        result = {}
+        for rule in cls.candidates:
+            pattern, fused, condition = rule
+            for pc, matched in Peephole((fused,)).fuse(code):
+                if matched is not None:
+                    result[fused] = result.get(fused, 0) + counts[pc] * (len(pattern) - 1)
+        return result
+
+    @classmethod
+    def select(cls, savings, total, threshold=0.01):  # fusions saving more than <threshold> of all dispatches
+        return tuple(fused for pattern, fused, condition in cls.candidates
+                     if savings.get(fused, 0) > threshold * total)
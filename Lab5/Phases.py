@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+import sys
+import time
+
+
+def size(node):  # number of AST nodes under <node>
+    import AST
+    count, pending = 0, [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending += node
+        elif isinstance(node, AST.Node):
+            count += 1
+            pending += node.children
+    return count
+
+
+class Phases(object):  # wall time, live memory blocks and optionally the tracemalloc peak of every pipeline phase
+
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = enabled
+        self.memory = memory and enabled
+        self.phases = []  # name, seconds, blocks and peak of every finished phase, in order
+        self.counters = {}
+        self.lexing = 0.0
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase = {'name': name, 'seconds': time.perf_counter() - start,
+                     'blocks': sys.getallocatedblocks() - blocks, 'peak': None}
+            if self.memory:
+                phase['peak'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.phases.append(phase)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def tokens(self, lexer):  # token function for the parser which times and counts the lexer, None when disabled
+        if not self.enabled:
+            return None
+        clock = time.perf_counter
+
+        def token():
+            start = clock()
+            result = lexer.token()
+            self.lexing += clock() - start
+            if result is not None:
+                self.counters['tokens'] = self.counters.get('tokens', 0) + 1
+            return result
+        return token
+
+    def split(self, name):  # lexing runs inside the parser, moves its time out of phase <name> into 'lex'
+        if not self.enabled:
+            return
+        index = next(i for i, phase in enumerate(self.phases) if phase['name'] == name)
+        self.phases[index]['seconds'] -= self.lexing
+        self.phases.insert(index, {'name': 'lex', 'seconds': self.lexing, 'blocks': None, 'peak': None})
+        self.lexing = 0.0
+
+    def visitor(self, cls, counter):  # subclass of visitor <cls> counting visited nodes, <cls> itself when disabled
+        if not self.enabled:
+            return cls
+        counters = self.counters
+
+        class Counting(cls):
+            def visit(self, node):
+                counters[counter] = counters.get(counter, 0) + 1
+                return cls.visit(self, node)
+        return Counting
+
+    def json(self):
+        import json
+        return json.dumps({'phases': self.phases, 'counters': self.counters,
+                           'total': sum(phase['seconds'] for phase in self.phases)}, indent=2)
+
+    def text(self):
+        result = ['{:<10} {:>10} {:>10} {:>10}'.format('phase', 'time [ms]', 'blocks', 'peak [KiB]')]
+        for phase in self.phases:
+            result.append('{:<10} {:>10.2f} {:>10} {:>10}'.format(
+                phase['name'], 1000 * phase['seconds'], '-' if phase['blocks'] is None else phase['blocks'],
+                '-' if phase['peak'] is None else round(phase['peak'] / 1024)))
+        result.append('{:<10} {:>10.2f}'.format('total', 1000 * sum(phase['seconds'] for phase in self.phases)))
+        result.append(', '.join('{}: {}'.format(name, value) for name, value in sorted(self.counters.items())))
+        return '\n'.join(result)
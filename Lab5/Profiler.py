@@ -0,0 +1,56 @@
+
+import time
+
+import AST
+from Interpreter import Interpreter
+
+statements = (AST.Assignment, AST.Print, AST.Break, AST.Continue, AST.Return, AST.If, AST.While, AST.For)
+
+
+class Profiler(Interpreter):  # Interpreter timing every visited node, main.py uses it only with --profile
+
+    def __init__(self):
+        super().__init__()
+        self.nodes = {}  # node -> [executions, total time, self time]
+        self.lines = {}  # line -> [statement executions, self time]
+        self.stacks = {}  # collapsed stack -> self time
+        self.frames = [('', 0, 0.0)]  # collapsed stack, line and time spent in children of every active node
+
+    def visit(self, node):
+        stack, line, _ = self.frames[-1]
+        line = node.lineno or line
+        stack = '{};{}:{}'.format(stack, type(node).__name__, line) if stack else '{}:{}'.format(type(node).__name__, line)
+        self.frames.append((stack, line, 0.0))
+        start = time.perf_counter()
+        try:
+            return Interpreter.visit(self, node)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.frames.pop()[2]
+            parent = self.frames[-1]
+            self.frames[-1] = parent[0], parent[1], parent[2] + elapsed
+            own = elapsed - children
+            stats = self.nodes.setdefault(node, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += own
+            stats = self.lines.setdefault(line, [0, 0.0])
+            stats[0] += isinstance(node, statements)
+            stats[1] += own
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + own
+
+    def report(self, limit=10):
+        total = sum(own for count, own in self.lines.values()) or 1.0
+        result = ['{:>6} {:>10} {:>10} {:>6}'.format('line', 'executions', 'self [s]', '%')]
+        for line, (count, own) in sorted(self.lines.items(), key=lambda item: -item[1][1])[:limit]:
+            result.append('{:>6} {:>10} {:>10.4f} {:>6.1f}'.format(line, count, own, 100 * own / total))
+        result.append('')
+        result.append('{:>6} {:>10} {:>10} {:>10}  {}'.format('line', 'executions', 'self [s]', 'total [s]', 'node'))
+        for node, (count, elapsed, own) in sorted(self.nodes.items(), key=lambda item: -item[1][2])[:limit]:
+            text = ' '.join(str(node).split())
+            result.append('{:>6} {:>10} {:>10.4f} {:>10.4f}  {}: {}'.format(
+                node.lineno, count, own, elapsed, type(node).__name__, text if len(text) <= 40 else text[:37] + '...'))
+        return '\n'.join(result)
+
+    def collapsed(self):  # one "frame;frame;... microseconds" line per stack, the input format of flamegraph.pl
+        return ''.join('{} {}\n'.format(stack, round(own * 1e6)) for stack, own in sorted(self.stacks.items()))
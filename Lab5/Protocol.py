@@ -0,0 +1,51 @@
+import json
+import os
+import socket
+import struct
+
+# Every message is a JSON object preceded by its length as a 4 byte
+# big-endian integer. A client sends
+#     {"argv": [...], "filename": "/absolute/path.m", "source": "..."}
+# and gets back
+#     {"status": 0, "stdout": "...", "stderr": "..."}
+
+SOCKET = os.environ.get('M_DAEMON_SOCKET') or '/tmp/m-daemon-{}.sock'.format(os.getuid())
+
+header = struct.Struct('>I')
+
+
+def encode(message):
+    data = json.dumps(message).encode()
+    return header.pack(len(data)) + data
+
+
+async def receive(reader):  # next message from an asyncio stream, None once the client hangs up
+    import asyncio
+    try:
+        size, = header.unpack(await reader.readexactly(header.size))
+        return json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def send(writer, message):
+    writer.write(encode(message))
+    await writer.drain()
+
+
+def recv(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('daemon closed the connection')
+        data += chunk
+    return data
+
+
+def request(message, path=SOCKET):  # blocking round trip to the daemon
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(encode(message))
+        size, = header.unpack(recv(sock, header.size))
+        return json.loads(recv(sock, size))
@@ -0,0 +1,101 @@
+import copy
+
+import AST
+
+# Helpers of the optimization passes over the syntax tree. A pass never
+# changes a node in place, since with hash-consing one node may stand at
+# many places of the tree: rebuild copies a node and the path down to
+# every replaced subtree and keeps all the rest.
+
+
+def children(node):  # subtrees of <node>, with the access a value or a variable wraps
+    result = [child for child in node.children if isinstance(child, AST.Node)]
+    if isinstance(node.leaf, AST.Node):
+        result.append(node.leaf)
+    return result
+
+
+def walk(node):  # <node> and every node under it, parents first
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending += reversed(children(node))
+
+
+def rebuild(node, replace):  # <node> with every subtree for which <replace> gives a node swapped for it
+    new = replace(node)
+    if new is not None:
+        return new
+    changed = {}
+    for child in children(node):
+        result = rebuild(child, replace)
+        if result is not child:
+            changed[id(child)] = result
+    if not changed:
+        return node
+    result = copy.copy(node)
+    nodes = [changed.get(id(child), child) for child in node.children]
+    for name, value in vars(node).items():
+        if value is node.children:  # also the instructions of a block, the expressions of a sequence
+            setattr(result, name, nodes)
+        elif isinstance(value, AST.Node) and id(value) in changed:
+            setattr(result, name, changed[id(value)])
+    return result
+
+
+def block(instructions, lineno=0):  # Block of a list of instructions, which may be empty
+    result = AST.Block(None)
+    result.instructions[:] = instructions
+    result.lineno = lineno
+    return result
+
+
+def statements(body):  # instructions of the body of an if or a loop
+    return body.line.instructions if isinstance(body.line, AST.Block) else [body.line]
+
+
+def assigned(node):  # names <node> may assign to
+    names = set()
+    for node in walk(node):
+        if isinstance(node, AST.Assignment):
+            target = node.left.name
+            names.add(target.variable if isinstance(target, AST.Access) else target)
+        elif isinstance(node, AST.For):
+            names.add(node.id)
+    return names
+
+
+def used(node):  # names <node> reads
+    return {node.name if isinstance(node, AST.Variable) else node.variable
+            for node in walk(node) if isinstance(node, (AST.Variable, AST.Access))
+            and not isinstance(node.leaf, AST.Node)} if isinstance(node, AST.Node) else set()
+
+
+def evaluated(statement):  # expressions <statement> evaluates once, before it assigns anything
+    if isinstance(statement, AST.Instruction):
+        return evaluated(statement.line)
+    if isinstance(statement, AST.Assignment):
+        target = statement.left.name
+        return [statement.right] + (list(target.key.expressions) if isinstance(target, AST.Access) else [])
+    if isinstance(statement, AST.Print):
+        return list(statement.expression.expressions)
+    if isinstance(statement, AST.Return):
+        return [statement.result]
+    if isinstance(statement, AST.If):
+        return [statement.condition]
+    if isinstance(statement, AST.For):
+        return [statement.range]
+    return []
+
+
+def bodies(statement):  # parts of <statement> which run any number of times, if at all
+    if isinstance(statement, AST.If):
+        return statement.children[1:]
+    if isinstance(statement, AST.While):
+        return statement.children
+    if isinstance(statement, AST.For):
+        return [statement.body]
+    if isinstance(statement, AST.Block):
+        return statement.instructions
+    return []
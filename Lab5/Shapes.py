@@ -0,0 +1,247 @@
+import copy
+
+import AST
+from TypeChecker import MatrixType, is_matrix
+from Rewrite import statements, walk
+
+# Static shape propagation. The pass runs through the program keeping,
+# for every variable, what is known of it on every path: the interval
+# of an integer, lo and hi, SCALAR for any other number, or the
+# MatrixType of a matrix, whose rows and cols are None where they vary.
+# Constant sizes given to zeros, ones and eye, matrix literals, and the
+# products, sums and transpositions of known shapes give shapes;
+# literals, for ranges and integer arithmetic give intervals. Loops are
+# run until what holds at their head is stable, an interval still
+# changing is dropped.
+#
+# An element access, read or stored, whose matrix has a known shape and
+# whose indices lie in bounds on every path that reaches it is proven,
+# and the Interpreter and the VM run it without the bounds check. The
+# proven nodes go with the program, the tree itself is not changed.
+# Only bounds checks are dropped: whole-matrix operations keep their
+# dimension check and their results are not allocated ahead.
+
+
+SCALAR = 'scalar'
+
+
+def scalar(value):
+    return isinstance(value, tuple) or value == SCALAR
+
+
+def join(a, b):
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return min(a[0], b[0]), max(a[1], b[1])
+    if scalar(a) and scalar(b):
+        return SCALAR
+    if is_matrix(a) and is_matrix(b):
+        return MatrixType(a.rows if a.rows == b.rows else None, a.cols if a.cols == b.cols else None)
+    return None
+
+
+def known(value):  # hashable form of a value, MatrixType compares only full shapes
+    return (value.rows, value.cols) if is_matrix(value) else value
+
+
+def merge(*environments):  # what holds after any of <environments>, None for one never reached
+    environments = [environment for environment in environments if environment is not None]
+    if not environments:
+        return None
+    result = dict(environments[0])
+    for environment in environments[1:]:
+        for name in list(result):
+            value = join(result[name], environment.get(name))
+            if value is None:
+                del result[name]
+            else:
+                result[name] = value
+    return result
+
+
+def widen(old, new):  # <new> without the intervals which grew since <old>
+    return {name: value for name, value in new.items()
+            if not isinstance(value, tuple) or old.get(name) == value}
+
+
+def same(a, b):
+    return a.keys() == b.keys() and all(known(a[name]) == known(b[name]) for name in a)
+
+
+def interval(operator, left, right):
+    if operator == '+':
+        return left[0] + right[0], left[1] + right[1]
+    if operator == '-':
+        return left[0] - right[1], left[1] - right[0]
+    products = [x * y for x in left for y in right]
+    return min(products), max(products)
+
+
+def shape(operator, left, right):  # MatrixType of a binary operation with at least one matrix operand
+    if operator == '*':
+        if is_matrix(left) and is_matrix(right):
+            return MatrixType(left.rows, right.cols)
+        if scalar(left) or scalar(right):
+            return left if is_matrix(left) else right
+        return MatrixType(left.rows, None) if is_matrix(left) else MatrixType(None, right.cols)
+    if operator in ('+', '-', '.+', '.-', '.*', './', '/'):
+        if is_matrix(left) and is_matrix(right):
+            return MatrixType(left.rows if left.rows is not None else right.rows,
+                              left.cols if left.cols is not None else right.cols)
+        return left if is_matrix(left) else right
+    return None
+
+
+class Shapes(object):
+
+    def __init__(self):
+        self.report = []  # (line, message) of every proven access
+        self.proven = {}  # Access -> whether it is in bounds everywhere it is reached
+        self.loops = []  # environments at the breaks and continues of every enclosing loop
+
+    def optimize(self, program):
+        self.proven = {}
+        self.block(program.program.instructions, {})
+        unchecked = frozenset(node for node, proven in self.proven.items() if proven)
+        reported = set()
+        for node in walk(program):  # in order, once every shared node
+            if node in unchecked and node not in reported:
+                reported.add(node)
+                self.report.append((node.lineno, "access to '{}' proven in bounds".format(node.variable)))
+        if not unchecked:
+            return program
+        result = copy.copy(program)
+        result.unchecked = unchecked
+        return result
+
+    def value(self, node, environment):  # what is known of the value of <node>, None for nothing
+        if isinstance(node, AST.Value):
+            if isinstance(node.primitive, AST.Node):
+                return self.value(node.primitive, environment)
+            if type(node.primitive) is int:
+                return node.primitive, node.primitive
+            return SCALAR if type(node.primitive) is float else None
+        if isinstance(node, AST.Matrix):
+            if not isinstance(node, AST.ConstantMatrix):
+                for row in node.rows.row_list:
+                    for expression in row.expressions:
+                        self.value(expression, environment)
+            return MatrixType(*node.dims)
+        if isinstance(node, AST.Variable):
+            return environment.get(node.name)
+        if isinstance(node, AST.Access):
+            self.access(node, environment)
+            return SCALAR
+        if isinstance(node, AST.Function):
+            sizes = [self.value(expression, environment) for expression in node.argument.expressions]
+            sizes = [size[0] if isinstance(size, tuple) and size[0] == size[1] else None for size in sizes]
+            return MatrixType(sizes[0], sizes[-1])
+        if isinstance(node, AST.Negation):
+            value = self.value(node.operand, environment)
+            return (-value[1], -value[0]) if isinstance(value, tuple) else value
+        if isinstance(node, AST.Transposition):
+            value = self.value(node.operand, environment)
+            return MatrixType(value.cols, value.rows) if is_matrix(value) else value
+        if isinstance(node, AST.BinaryExpression):
+            return self.binary(node.operator, self.value(node.left, environment), self.value(node.right, environment))
+        return None
+
+    @staticmethod
+    def binary(operator, left, right):
+        if scalar(left) and scalar(right):
+            if isinstance(left, tuple) and isinstance(right, tuple) and operator in ('+', '-', '*'):
+                return interval(operator, left, right)
+            return SCALAR
+        if is_matrix(left) or is_matrix(right):
+            return shape(operator, left, right)
+        return None
+
+    def access(self, node, environment):
+        indices = [self.value(expression, environment) for expression in node.key.expressions]
+        matrix = environment.get(node.variable)
+        proven = is_matrix(matrix) and matrix.shape is not None and len(indices) in (1, 2) \
+            and all(isinstance(index, tuple) for index in indices)
+        if proven:
+            bounds = [matrix.rows * matrix.cols] if len(indices) == 1 else matrix.shape
+            proven = all(1 <= index[0] and index[1] <= bound for index, bound in zip(indices, bounds))
+        self.proven[node] = self.proven.get(node, True) and proven
+
+    def block(self, instructions, environment):  # what holds after <instructions>, None when they never end
+        for statement in instructions:
+            if environment is None:
+                break
+            environment = self.statement(statement, environment)
+        return environment
+
+    def statement(self, node, environment):
+        if isinstance(node, AST.Instruction):
+            return self.statement(node.line, environment)
+        if isinstance(node, AST.Block):
+            return self.block(node.instructions, environment)
+        if isinstance(node, AST.Assignment):
+            return self.assignment(node, environment)
+        if isinstance(node, AST.Print):
+            for expression in node.expression.expressions:
+                self.value(expression, environment)
+            return environment
+        if isinstance(node, AST.Return):
+            self.value(node.result, environment)
+            return None
+        if isinstance(node, (AST.Break, AST.Continue)):
+            self.loops[-1][isinstance(node, AST.Continue)].append(environment)
+            return None
+        if isinstance(node, AST.If):
+            self.value(node.condition, environment)
+            return merge(*[self.block(statements(body), environment) for body in node.children[1:]]
+                         + ([environment] if node.else_expression is None else []))
+        if isinstance(node, AST.While):
+            return self.loop(node, environment)
+        if isinstance(node, AST.For):
+            return self.loop(node, environment)
+        return environment
+
+    def assignment(self, node, environment):
+        value = self.value(node.right, environment)
+        target = node.left.name
+        if isinstance(target, AST.Access):  # the shape of the matrix stays
+            self.access(target, environment)
+            return environment
+        if node.operator != '=':
+            value = self.binary(node.operator[0], environment.get(target), value)
+        environment = dict(environment)
+        if value is None:
+            environment.pop(target, None)
+        else:
+            environment[target] = value
+        return environment
+
+    def index(self, node, environment):  # interval of the variable of a for loop
+        start, end = self.value(node.start, environment), self.value(node.end, environment)
+        step = self.value(node.step, environment) if isinstance(node.step, AST.Node) else (node.step, node.step)
+        if not all(isinstance(bound, tuple) for bound in (start, end, step)):
+            return None
+        if step[0] > 0:
+            return start[0], end[1]
+        if step[1] < 0:
+            return end[0], start[1]
+        return None
+
+    def loop(self, node, environment):
+        index = self.index(node.range, environment) if isinstance(node, AST.For) else None
+        head = environment
+        while True:  # intervals only widen and dimensions only become None, so the head settles
+            if isinstance(node, AST.While):
+                self.value(node.condition, head)
+            body = head
+            if isinstance(node, AST.For):
+                body = dict(head)
+                if index is None:
+                    body.pop(node.id, None)
+                else:
+                    body[node.id] = index
+            self.loops.append(([], []))
+            end = self.block(statements(node.body), body)
+            breaks, continues = self.loops.pop()
+            grown = widen(head, merge(head, end, *continues))
+            if same(grown, head):
+                return merge(head, *breaks)
+            head = grown
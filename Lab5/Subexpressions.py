@@ -0,0 +1,131 @@
+import AST
+from TypeChecker import TypeChecker, is_matrix
+from Rewrite import walk, rebuild, block, statements, assigned, used, evaluated, bodies
+
+# Common subexpression elimination. An operation found more than once
+# in the statements of a block, with no assignment to a variable it
+# reads in between, is computed once into a hidden temporary $cseN,
+# a name no identifier of the lexer can take, assigned just before its
+# first statement, and every occurrence reads the temporary. Only what
+# a statement evaluates exactly once is looked at: right sides, indices,
+# printed and returned values, if conditions and for ranges. Bodies of
+# ifs and loops are blocks of their own. The temporary costs an
+# assignment and a lookup, so scalar operations are shared only when
+# they hold two operators or more, matrix products and functions
+# always. Matrix values are copied on write, so a temporary and the
+# variables it is assigned to never see each other's changes.
+
+pure = (AST.BinaryExpression, AST.Transposition, AST.Function)
+
+
+def variable(name, lineno):
+    result = AST.Variable(name)
+    result.lineno = lineno
+    return result
+
+
+def same(instructions, others):
+    return len(instructions) == len(others) and all(a is b for a, b in zip(instructions, others))
+
+
+class Subexpressions(object):
+
+    def __init__(self):
+        self.count = 0
+        self.report = []  # (line, message) of every temporary
+        self.types = {}  # node -> type, from the type checker
+        self.structures = {}  # id of a node -> the node and its structure
+
+    def optimize(self, program):
+        self.types = {}
+        TypeChecker(types=self.types).visit(program)
+        instructions = program.program.instructions
+        result = self.block(instructions)
+        return program if same(result, instructions) else AST.Program(block(result, program.program.lineno))
+
+    def block(self, instructions):
+        instructions = [self.nested(statement) for statement in instructions]
+        while True:
+            found = self.candidate(instructions)
+            if found is None:
+                return instructions
+            instructions = self.hoist(instructions, *found)
+
+    def nested(self, statement):  # <statement> with the blocks in it optimized
+        if isinstance(statement, AST.Block):
+            result = self.block(statement.instructions)
+            return statement if same(result, statement.instructions) else block(result, statement.lineno)
+        parts = [part for part in bodies(statement) if isinstance(part, AST.Instruction)]
+        if not parts:
+            return statement
+        return rebuild(statement, lambda node: self.body(node) if any(node is part for part in parts) else None)
+
+    def body(self, body):
+        instructions = statements(body)
+        result = self.block(instructions)
+        if same(result, instructions):
+            return body
+        instruction = AST.Instruction(block(result, body.lineno))
+        instruction.lineno = body.lineno
+        return instruction
+
+    def structure(self, node):
+        entry = self.structures.get(id(node))
+        if entry is None or entry[0] is not node:
+            entry = self.structures[id(node)] = node, node.structure()
+        return entry[1]
+
+    def worth(self, node):
+        return isinstance(node, AST.Function) or is_matrix(self.types.get(node)) or sum(1 for _ in walk(node)) >= 5
+
+    def candidate(self, instructions):  # structure and occurrences of the largest expression worth a temporary
+        occurrences = {}  # structure -> (index of the statement, node) in order
+        for index, statement in enumerate(instructions):
+            for root in evaluated(statement):
+                for node in walk(root):
+                    if isinstance(node, pure) and not isinstance(node, AST.Assignment):
+                        occurrences.setdefault(self.structure(node), []).append((index, node))
+        kills = None  # names every statement assigns
+        best = None
+        for key, found in occurrences.items():
+            if len(found) < 2:
+                continue
+            if kills is None:
+                kills = [assigned(statement) for statement in instructions]
+            names = used(found[0][1])
+            group = found[:1]
+            for occurrence in found[1:] + [None]:
+                if occurrence is not None and not (names and any(
+                        kills[index] & names for index in range(group[-1][0], occurrence[0]))):
+                    group.append(occurrence)
+                    continue
+                if len(group) > 1 and self.worth(group[0][1]):
+                    rank = sum(1 for _ in walk(group[0][1])), -group[0][0]
+                    if best is None or rank > best[0]:
+                        best = rank, key, group
+                group = [occurrence]
+        return None if best is None else best[1:]
+
+    def hoist(self, instructions, key, group):
+        index, node = group[0]
+        name = '$cse{}'.format(self.count)
+        self.count += 1
+
+        def replace(node):
+            if isinstance(node, pure) and not isinstance(node, AST.Assignment) and self.structure(node) == key:
+                return variable(name, node.lineno)
+            return None
+
+        result = list(instructions)
+        for target in {index for index, _ in group}:
+            statement = result[target]
+            stop = bodies(statement)
+            result[target] = rebuild(statement, lambda node: node if any(node is part for part in stop)
+                                     else replace(node))
+        assignment = AST.Assignment(variable(name, node.lineno), '=', node)
+        assignment.lineno = node.lineno
+        temporary = AST.Instruction(assignment)
+        temporary.lineno = node.lineno
+        result.insert(index, temporary)
+        self.report.append((node.lineno, '{} computed once for {} uses into {}'.format(node, len(group), name)))
+        return result
@@ -0,0 +1,153 @@
+
+from Bytecode import *
+from Operations import binary_operations, assignment_operations, functions, negate, transpose, inclusive_range
+from LazyMatrix import force
+from Memory import Memory
+from MatrixValue import MatrixValue
+
+
+def table(operations, opcodes):
+    result = [None] * len(opnames)
+    for name, opcode in opcodes.items():
+        result[opcode] = operations[name]
+    return result
+
+
+class VM(object):
+
+    binary_operations = table(binary_operations, binary_opcodes)
+    assignment_operations = table(assignment_operations, assignment_opcodes)
+    functions = table(functions, function_opcodes)
+
+    def __init__(self, memory=None):
+        self.memory = memory if memory is not None else Memory('global')
+
+    def run(self, code):
+        instructions = code.instructions
+        variables = self.memory.variables
+        binary = self.binary_operations
+        stack = []
+        push, pop = stack.append, stack.pop
+        done = object()
+        pc = 0
+        try:
+            while True:
+                op, arg = instructions[pc]
+                pc += 1
+                if op <= EQUAL:
+                    right = pop()
+                    stack[-1] = binary[op](stack[-1], right)
+                elif op == NAME_CONST_BINARY_JUMP:
+                    name, const, binop, target = arg
+                    if not binary[binop](variables[name], const):
+                        pc = target
+                elif op == NAME_CONST_BINARY_ASSIGN:
+                    name, const, binop, target = arg
+                    value = force(binary[binop](variables[name], const))
+                    variables[target] = value.share() if isinstance(value, MatrixValue) else value
+                elif op == FOR_ITER_ASSIGN:
+                    target, name = arg
+                    value = next(stack[-1], done)
+                    if value is done:
+                        pop()
+                        pc = target
+                    else:
+                        variables[name] = value
+                elif op == NAME_NAME_BINARY_ASSIGN:
+                    name, other, binop, target = arg
+                    value = force(binary[binop](variables[name], variables[other]))
+                    variables[target] = value.share() if isinstance(value, MatrixValue) else value
+                elif op == NAME_NAME_BINARY_JUMP:
+                    name, other, binop, target = arg
+                    if not binary[binop](variables[name], variables[other]):
+                        pc = target
+                elif op == NAME_CONST_BINARY:
+                    name, const, binop = arg
+                    push(binary[binop](variables[name], const))
+                elif op == NAME_NAME_BINARY:
+                    name, other, binop = arg
+                    push(binary[binop](variables[name], variables[other]))
+                elif op == CONST_ASSIGN:
+                    const, name = arg
+                    variables[name] = const
+                elif op == LOAD_NAME:
+                    push(variables[arg])
+                elif op == LOAD_CONST:
+                    push(arg)
+                elif op == ASSIGN:
+                    value = force(pop())
+                    variables[arg] = value.share() if isinstance(value, MatrixValue) else value
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == JUMP:
+                    pc = arg
+                elif op == FOR_ITER:
+                    value = next(stack[-1], done)
+                    if value is done:
+                        pop()
+                        pc = arg
+                    else:
+                        push(value)
+                elif op <= DIVIDEASSIGN:
+                    variables[arg] = self.assignment_operations[op](variables[arg], force(pop()))
+                elif op == LOAD_ELEMENT:
+                    name, n = arg
+                    key = tuple(stack[-n:])
+                    del stack[-n:]
+                    push(variables[name][key])
+                elif op == STORE_ELEMENT:
+                    name, n = arg
+                    value = pop()
+                    key = tuple(stack[-n:])
+                    del stack[-n:]
+                    variables[name][key] = value
+                elif op == LOAD_ELEMENT_UNCHECKED:
+                    name, n = arg
+                    key = stack[-n:]
+                    del stack[-n:]
+                    push(variables[name].get(key))
+                elif op == STORE_ELEMENT_UNCHECKED:
+                    name, n = arg
+                    value = pop()
+                    key = stack[-n:]
+                    del stack[-n:]
+                    variables[name].put(key, value)
+                elif op == UMINUS:
+                    stack[-1] = negate(stack[-1])
+                elif op == TRANSPOSE:
+                    stack[-1] = transpose(stack[-1])
+                elif op == LOAD_MATRIX:
+                    push(arg.share())
+                elif op == BUILD_MATRIX:
+                    values = stack[len(stack) - sum(arg):]
+                    del stack[len(stack) - sum(arg):]
+                    rows, start = [], 0
+                    for length in arg:
+                        rows.append(values[start:start + length])
+                        start += length
+                    push(MatrixValue.from_rows(rows))
+                elif op == RANGE:
+                    step = pop() if arg else 1
+                    end = pop()
+                    stack[-1] = iter(inclusive_range(stack[-1], end, step))
+                elif op == PRINT:
+                    values = stack[len(stack) - arg:]
+                    del stack[len(stack) - arg:]
+                    print(*map(force, values))
+                elif op == POP:
+                    pop()
+                elif op == ASSIGN_LOAD:
+                    value = force(pop())
+                    variables[arg] = value.share() if isinstance(value, MatrixValue) else value
+                    push(variables[arg])
+                elif op == COUNT:
+                    arg[0][arg[1]] += 1
+                elif op == RETURN:
+                    return force(pop())
+                elif op <= ONES:
+                    args = stack[len(stack) - arg:]
+                    del stack[len(stack) - arg:]
+                    push(self.functions[op](*args))
+        except KeyError as e:
+            raise NameError("undefined variable '{}'".format(e.args[0]))
@@ -0,0 +1,39 @@
+
+import os
+import sys
+
+import main
+import Protocol
+
+# Same command line as main.py, the work is done by a running daemon.py
+# and the script runs locally when there is none.
+#
+#     python client.py [main.py arguments]
+
+if __name__ == '__main__':
+
+    args = main.arguments().parse_args()
+
+    try:
+        stdin = args.stream and args.filename == '-'
+        filename = args.filename if stdin else os.path.abspath(args.filename)
+        file = sys.stdin if stdin else open(filename, "r")
+    except IOError:
+        print("Cannot open {0} file".format(args.filename))
+        sys.exit(0)
+
+    text = file.read()
+    try:
+        response = Protocol.request({'argv': sys.argv[1:], 'filename': filename, 'source': text})
+    except (FileNotFoundError, ConnectionRefusedError):
+        response = None
+    if response is None:
+        status = 0
+        try:
+            main.execute(args, text)
+        except SystemExit as e:  # the status main.py would exit with
+            status = e.code
+        sys.exit(status)
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['status'])
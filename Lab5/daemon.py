@@ -0,0 +1,89 @@
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import os
+import signal
+import sys
+import traceback
+
+import main
+import Protocol
+from Mparser import MParser
+
+# Long-running server keeping the parser tables and every module of the
+# pipeline loaded. It runs the same commands as main.py for clients of
+# client.py, while any number of clients stay connected. Requests run in
+# a pool of worker processes, each with its own parser, so a long script
+# does not hold up the others and the GIL is not shared. A worker runs
+# one request at a time, so its output can be captured by redirecting
+# sys.stdout and sys.stderr of the process.
+#
+#     python daemon.py [socket] [workers]
+
+parser = None  # MParser of a worker process
+
+
+def prepare():  # loads the pipeline once in every worker
+    global parser
+    parser = MParser()
+    parser.build()
+    import TypeChecker, TreePrinter, Interpreter, Profiler, Compiler, Peephole
+
+
+def execute(request):  # response to <request>, in a worker
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = 0
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            args = main.arguments().parse_args(request['argv'])
+            args.filename = request['filename']
+            main.execute(args, request['source'], parser)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    return {'status': status, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+class Daemon(object):
+
+    def __init__(self, workers=None):  # even on one core a short request should not wait for a long one
+        self.pool = ProcessPoolExecutor(workers or max(4, os.cpu_count() or 1), initializer=prepare)
+
+    async def serve(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request = await Protocol.receive(reader)
+                if request is None:
+                    break
+                await Protocol.send(writer, await loop.run_in_executor(self.pool, execute, request))
+        finally:
+            writer.close()
+
+
+async def start(path, workers=None):
+    daemon = Daemon(workers)
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(daemon.serve, path)
+    print('listening on {}'.format(path))
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set_result, None)
+    try:
+        async with server:
+            await stopped
+    finally:
+        daemon.pool.shutdown(cancel_futures=True)  # the workers do not outlive the daemon
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(start(sys.argv[1] if len(sys.argv) > 1 else Protocol.SOCKET,
+                          int(sys.argv[2]) if len(sys.argv) > 2 else None))
+    except KeyboardInterrupt:
+        pass
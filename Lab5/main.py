@@ -1,34 +1,205 @@
 
+import argparse
+import functools
+import os
 import sys
-import ply.yacc as yacc
-from Mparser import Mparser
-from TreePrinter import TreePrinter
-from TypeChecker import TypeChecker
-from Interpreter import Interpreter
+
+sys.path += [os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, lab) for lab in ('Lab3', 'Lab4')]
+
+from Phases import Phases, size
+from VM import VM
+import Bytecode
+
+# The front end, and PLY with it, is imported only when a script has to
+# be parsed, running cached bytecode needs just the VM.
+
+
+def parse(text, phases, mParser=None, check=True, output='text', limit=100, mapped=None, stream=None, share=False,
+          optimize=False, report=False):
+    # <mParser> is an already built parser to reuse, in place of <text> the input may be <mapped>,
+    # a file to lex through mmap, or <stream>, an iterable of chunks lexed as they arrive
+    from Mparser import MParser
+    from TypeChecker import TypeChecker
+    from Diagnostics import Diagnostics
+    with phases.phase('build'):
+        if mParser is None:
+            mParser = MParser()
+            mParser.build()
+        lexer = None
+        if mapped:
+            lexer = mParser.matrix_lexer.mapped(mapped, limit)
+        elif stream is not None:
+            lexer = mParser.matrix_lexer.stream(stream, limit)
+        state = mParser.state(limit, lexer, share)
+    with phases.phase('parse'):
+        ast = mParser.parse(text if lexer is None else None, state, phases.tokens(state.lexer)).ast
+    if mapped:
+        state.lexer.close()
+    phases.split('parse')
+    if state.diagnostics:
+        print(state.diagnostics.json() if output == 'json' else state.diagnostics.text())
+    if state.failed:
+        sys.exit(1)
+    phases.count('nodes', size(ast) if phases.enabled else 0)
+    if check:
+        with phases.phase('check'):
+            typeChecker = phases.visitor(TypeChecker, 'checked')(diagnostics=Diagnostics(limit))
+            typeChecker.visit(ast)
+        if typeChecker.diagnostics:
+            print(typeChecker.diagnostics.json() if output == 'json' else typeChecker.diagnostics.text())
+        if typeChecker.errors:
+            sys.exit(1)
+        if optimize:
+            ast = optimize_tree(ast, phases, report)
+    return ast
+
+
+def optimize_tree(ast, phases, report=False):  # the checked tree after every optimization pass
+    from DeadCode import DeadCode
+    from Subexpressions import Subexpressions
+    from Shapes import Shapes
+    for name, Pass in (('dce', DeadCode), ('cse', Subexpressions), ('shapes', Shapes)):
+        optimizer = Pass()
+        with phases.phase(name):
+            ast = optimizer.optimize(ast)
+        if report:
+            for line, message in optimizer.report:
+                print('{} at line {}: {}'.format(name, line, message), file=sys.stderr)
+    return ast
+
+
+def run_streamed(interpreter, phases, mParser=None, output='text', limit=100, stream=None, share=False, **options):
+    # runs every top-level instruction of <stream> once it is parsed and checked, while the rest is still read
+    from Mparser import MParser
+    from TypeChecker import TypeChecker
+    from Exceptions import ReturnValueException
+    with phases.phase('build'):
+        if mParser is None:
+            mParser = MParser()
+            mParser.build()
+        state = mParser.state(limit, mParser.matrix_lexer.stream(stream, limit), share)
+    typeChecker = phases.visitor(TypeChecker, 'checked')(diagnostics=state.diagnostics)
+    with phases.phase('run'):
+        try:
+            for instruction in mParser.instructions(None, state):
+                typeChecker.visit(instruction)
+                if not state.diagnostics.errors:  # after an error only checking goes on
+                    instruction.accept(interpreter)
+        except ReturnValueException:
+            pass
+    if state.diagnostics:
+        print(state.diagnostics.json() if output == 'json' else state.diagnostics.text())
+    if state.diagnostics.errors:
+        sys.exit(1)
+
+
+def compile(filename, text, phases, mParser=None, **options):  # bytecode from the cache file next to the script, compiled on a miss
+    source = ('optimized', text) if options.get('optimize') else text  # the cache tells the two builds apart
+    with phases.phase('load'):
+        code = Bytecode.load(filename, source) if text is not None else None
+    if code is None:
+        from Compiler import Compiler
+        from Peephole import Peephole
+        ast = parse(text, phases, mParser, **options)
+        with phases.phase('compile'):
+            code = Peephole().optimize(Compiler().compile(ast))
+            if text is not None:  # the cache holds the source, mapped and streamed inputs are not read whole
+                Bytecode.save(filename, source, code)
+    phases.count('instructions', len(code))
+    return code
+
+
+def run(function, *args):  # a runtime error of the script ends it with a message, not a traceback
+    from Exceptions import runtime_errors
+    try:
+        function(*args)
+    except runtime_errors as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        sys.exit(1)
+
+
+def arguments():  # command line of main.py, shared with the daemon client
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument('filename', nargs='?', default='example.txt')
+    arguments.add_argument('--tree', action='store_true', help='print the syntax tree instead of running the script')
+    arguments.add_argument('--check', action='store_true', help='only parse and type check the script')
+    arguments.add_argument('--vm', action='store_true', help='compile to bytecode and run it on the VM')
+    arguments.add_argument('--dis', action='store_true', help='print the bytecode instead of running it')
+    arguments.add_argument('--caches', action='store_true', help='print inline cache hit rates to stderr')
+    arguments.add_argument('--profile', action='store_true',
+                           help='print hot lines and nodes to stderr, write collapsed stacks to <filename>.folded')
+    arguments.add_argument('--phases', action='store_true', help='print the time and counters of every phase to stderr')
+    arguments.add_argument('--json', action='store_true', help='print --phases as JSON')
+    arguments.add_argument('--memory', action='store_true', help='add tracemalloc peaks to --phases, slows every phase')
+    arguments.add_argument('--diagnostics', choices=('text', 'json'), default='text', help='format of syntax and type errors')
+    arguments.add_argument('--max-errors', type=int, default=100, help='syntax errors reported per file')
+    arguments.add_argument('--mmap', action='store_true',
+                           help='lex the memory-mapped file instead of reading it, for very large scripts')
+    arguments.add_argument('--share', action='store_true',
+                           help='hash-cons the syntax tree, identical pure subexpressions become one node')
+    arguments.add_argument('--optimize', action='store_true',
+                           help='run the optimization passes over the checked tree, not with --stream')
+    arguments.add_argument('--report', action='store_true', help='print what --optimize changed to stderr')
+    arguments.add_argument('--stream', action='store_true',
+                           help="lex and parse the script line by line as it is read, '-' reads standard input, "
+                                "the interpreter runs every top-level instruction as soon as it is parsed")
+    return arguments
+
+
+def execute(args, text, mParser=None, stream=None):  # <stream> replaces <text> with --stream
+    filename = args.filename
+    phases = Phases(args.phases, args.memory)
+    options = {'output': args.diagnostics, 'limit': args.max_errors, 'mapped': filename if args.mmap else None,
+               'stream': stream if args.stream else None, 'share': args.share,
+               'optimize': args.optimize, 'report': args.report}
+    if args.stream and stream is None:  # text sent by the daemon client
+        options['stream'] = text.splitlines(True)
+    if args.mmap or args.stream:
+        text = None
+    if args.tree:
+        import TreePrinter
+        print(parse(text, phases, mParser, check=args.optimize, **options).printTree())
+    elif args.check:
+        parse(text, phases, mParser, **options)
+    elif args.dis:
+        print(compile(filename, text, phases, mParser, **options).disassemble())
+    elif args.vm:
+        code = compile(filename, text, phases, mParser, **options)
+        with phases.phase('run'):
+            run(VM().run, code)
+    else:
+        from Interpreter import Interpreter
+        from InlineCache import report
+        from Profiler import Profiler
+        interpreter = phases.visitor(Profiler if args.profile else Interpreter, 'visited')()
+        if args.stream:
+            run(functools.partial(run_streamed, interpreter, phases, mParser, **options))
+        else:
+            ast = parse(text, phases, mParser, **options)
+            with phases.phase('run'):
+                run(ast.accept, interpreter)
+        if args.caches:
+            print(report(list(interpreter.caches.values())), file=sys.stderr)
+        if args.profile:
+            print(interpreter.report(), file=sys.stderr)
+            with open(os.path.splitext(filename)[0] + '.folded', 'w') as folded:
+                folded.write(interpreter.collapsed())
+    if args.phases:
+        print(phases.json() if args.json else phases.text(), file=sys.stderr)
 
 
 if __name__ == '__main__':
 
+    args = arguments().parse_args()
+
     try:
-        filename = sys.argv[1] if len(sys.argv) > 1 else "example.txt"
-        file = open(filename, "r")
+        filename = args.filename
+        file = sys.stdin if args.stream and filename == '-' else open(filename, "r")
     except IOError:
         print("Cannot open {0} file".format(filename))
         sys.exit(0)
 
-    Mparser = Mparser()
-    parser = yacc.yacc(module=Mparser)
-    text = file.read()
-
-    ast = parser.parse(text, lexer=Mparser.scanner)
-
-    # Below code shows how to use visitor
-    typeChecker = TypeChecker()   
-    typeChecker.visit(ast)   # or alternatively ast.accept(typeChecker)
-
-    ast.accept(Interpreter())
-    # in future
-    # ast.accept(OptimizationPass1())
-    # ast.accept(OptimizationPass2())
-    # ast.accept(CodeGenerator())
-    
\ No newline at end of file
+    if args.mmap or args.stream:
+        execute(args, None, stream=file)
+    else:
+        execute(args, file.read())
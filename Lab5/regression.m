@@ -0,0 +1,115 @@
+# programs fixed after review, the output has to stay as in regression.out
+#
+#     python main.py regression.m | diff - regression.out
+#
+# and the same with --vm, --optimize and --share in any combination, and
+# what the optimizer does to them as in regression.report
+#
+#     python main.py --optimize --report regression.m 2>&1 >/dev/null | diff - regression.report
+
+# a float stored into an integer matrix that is a transposed view
+A = [1, 2, 5; 3, 4, 6] .+ 0;
+B = A';
+A = 0;
+B[1, 2] = 0.5;
+print B;
+
+# a variable named like the temporaries of common subexpressions
+__cse0 = 100;
+C = ones(2);
+x = C * C;
+y = C * C;
+print __cse0, x, y;
+
+# a sparse matrix filled element by element turns dense in place
+Z = zeros(4);
+W = Z;
+for i = 1:4 {
+    for j = 1:4 {
+        Z[i, j] = i * j;
+    }
+}
+print Z, W;
+
+# matrices compare by their elements
+H = ones(2);
+K = H;
+if (H == K) print "same";
+if (H == H .+ 0) print "equal";
+if (H != 2 * H) print "different";
+
+# products of integer matrices stay integers
+G = [1, 2; 3, 4] * [1, 2; 3, 4];
+print G[1, 1], G, [1, 2] * eye(2);
+
+# matrix elements print in full, as the scalars do
+print [1000000, 2; 3, 4], [3.14159265358979, 2.5], ones(2) .* 1234567, eye(2) .* 0.1;
+
+# shapes: accesses which are in bounds here but cannot be proven, so
+# regression.report must not list them: a for variable assigned in its
+# body, a value left at a break and one left at a continue
+S = zeros(3);
+for i = 1:3 {
+    i = i * 2;
+    if (i <= 3) S[i, 1] = i;
+}
+k = 1;
+for i = 1:3 {
+    if (i == 2) {
+        k = 5;
+        break;
+    }
+}
+if (k <= 3) S[k, 2] = k;
+k = 1;
+for i = 1:3 {
+    if (k <= 3) S[k, 3] = i;
+    k = 1;
+    if (i == 2) {
+        k = 4;
+        continue;
+    }
+}
+print S;
+
+# dead code: w is never read and goes, what is read after a break or at
+# the next iteration after a continue stays, and so does y, as x is left
+# unassigned on some path and reading it could fail
+n = 0;
+for i = 1:5 {
+    w = i * 2;
+    n = i;
+    if (i == 3) break;
+}
+m = 0;
+k = 0;
+for i = 1:5 {
+    k = k + 1;
+    if (i > 2) continue;
+    m = k;
+}
+print n, m, k;
+c = 0;
+if (c == 0) x = 1;
+y = x + 1;
+
+# common subexpressions: the store into M[1, 1] ends the first group of
+# M * M, the two after it are computed once, and a temporary given to
+# two variables is not changed through either of them
+M = [1, 2; 3, 4];
+p = M * M;
+M[1, 1] = 10;
+q = M * M;
+r = M * M;
+q[2, 2] = 0;
+print p, q, r;
+
+# a transposed view and its source are stored into separately, each
+# keeps its own elements, a single index runs through the view by rows
+# and a view of the view follows the view
+V = [1, 2, 3; 4, 5, 6];
+T = V';
+T[1, 2] = 40;
+V[2, 3] = 60;
+U = T';
+print V, T, T[2], T[5], U;
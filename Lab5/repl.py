@@ -0,0 +1,132 @@
+
+import argparse
+import os
+import sys
+import time
+
+sys.path += [os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, lab) for lab in ('Lab3', 'Lab4')]
+
+from Mparser import MParser
+from Diagnostics import Diagnostics
+from TypeChecker import TypeChecker
+from Interpreter import Interpreter
+from Exceptions import ReturnValueException, runtime_errors
+from LazyMatrix import force
+
+try:
+    import readline  # line editing and history for input()
+except ImportError:
+    pass
+
+# Interactive session: every statement or {} block entered is parsed,
+# checked against the symbol table of all earlier entries and run in the
+# memory they left. An if waits for the next line, which may start with
+# else, or for an empty line. Parsed entries are kept by their text, so
+# running one again from the history skips the parser.
+#
+#     python repl.py [--quiet]
+
+
+class Repl(object):
+
+    def __init__(self, timing=True):
+        self.parser = MParser()
+        self.parser.build()
+        self.checker = TypeChecker()
+        self.interpreter = Interpreter()
+        self.cache = {}  # text of an entry -> its instructions
+        self.timing = timing
+
+    def complete(self, text, held=True):  # length of the whole statements and blocks <text> starts with
+        # cut as MParser.instructions cuts, with <held> an if at the end is not whole while an ELSE may follow
+        lexer = self.parser.matrix_lexer.clone()
+        lexer.input(text)
+        end, depth, ifs, cut = 0, 0, 0, False
+        for token in lexer:
+            if cut and token.type != 'ELSE':
+                end, ifs = token.lexpos, 0
+            if token.type in MParser.opening:
+                depth += 1
+            elif token.type in MParser.closing:
+                depth = max(depth - 1, 0)
+            elif depth == 0 and token.type in ('IF', 'ELSE'):
+                ifs += 1 if token.type == 'IF' else -1
+            cut = depth == 0 and token.type in ('SEMICOLON', 'RCURLY')
+        return len(text) if cut and not (held and ifs > 0) else end
+
+    def parse(self, text):  # instructions of <text>, None after syntax errors
+        key = text.strip()
+        if key not in self.cache:
+            state = self.parser.state()
+            instructions = list(self.parser.instructions(text, state))
+            if state.diagnostics:
+                print(state.diagnostics.text())
+            if state.diagnostics.errors:
+                return None
+            self.cache[key] = instructions
+        return self.cache[key]
+
+    def check(self, instructions):  # declarations of an entry with errors are dropped
+        table = self.checker.table
+        symbols = dict(table.symbols)
+        self.checker.diagnostics = Diagnostics()
+        for instruction in instructions:
+            self.checker.visit(instruction)
+        if self.checker.diagnostics:
+            print(self.checker.diagnostics.text())
+        if self.checker.errors:
+            table.symbols = symbols
+            return False
+        return True
+
+    def execute(self, text):
+        cached = text.strip() in self.cache
+        start = time.perf_counter()
+        instructions = self.parse(text)
+        parsed = time.perf_counter()
+        if instructions is None or not self.check(instructions):
+            return
+        checked = time.perf_counter()
+        try:
+            for instruction in instructions:
+                instruction.accept(self.interpreter)
+        except ReturnValueException as e:
+            print(force(e.value))
+        except runtime_errors as e:
+            print('Error: {}'.format(e))
+        if self.timing:
+            print('parse {:.3f} ms{}, check {:.3f} ms, run {:.3f} ms'.format(
+                1000 * (parsed - start), ' (cached)' if cached else '', 1000 * (checked - parsed),
+                1000 * (time.perf_counter() - checked)), file=sys.stderr)
+
+
+def main():
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument('--quiet', action='store_true', help='do not print the time of every entry')
+    args = arguments.parse_args()
+
+    repl = Repl(not args.quiet)
+    interactive = sys.stdin.isatty()
+    text = ''
+    while True:
+        try:
+            line = input(('... ' if text else '>>> ') if interactive else '')
+        except EOFError:
+            break
+        except KeyboardInterrupt:
+            print()
+            text = ''
+            continue
+        text += line + '\n'
+        end = repl.complete(text, held=bool(line.strip()))  # an empty line ends an if without else
+        if text[:end].strip():
+            repl.execute(text[:end])
+        text = text[end:] if text[end:].strip() else ''
+    if text.strip():
+        repl.execute(text)
+    if interactive:
+        print()
+
+
+if __name__ == '__main__':
+    main()
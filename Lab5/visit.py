@@ -20,7 +20,7 @@ def when(param_type):
   # dispatcher is an function object
   def f(fn):
     frame = inspect.currentframe().f_back
-    dispatcher = frame.f_locals[fn.func_name]
+    dispatcher = frame.f_locals[fn.__name__]
     if not isinstance(dispatcher, Dispatcher):
       dispatcher = dispatcher.dispatcher
     dispatcher.add_target(param_type, fn)
@@ -35,7 +35,7 @@ class Dispatcher(object):
   def __init__(self, param_name, fn):
     frame = inspect.currentframe().f_back.f_back   # these 2 lines
     top_level = frame.f_locals == frame.f_globals  # seem redundant
-    self.param_index = inspect.getargspec(fn).args.index(param_name)
+    self.param_index = inspect.getfullargspec(fn).args.index(param_name)
     self.param_name = param_name
     self.targets = {}
 
@@ -47,7 +47,7 @@ class Dispatcher(object):
     else:
       issub = issubclass
       t = self.targets
-      ks = t.iterkeys()
+      ks = t.keys()
       return [ t[k](*args, **kw) for k in ks if issub(typ, k) ]
 
   def add_target(self, typ, target):
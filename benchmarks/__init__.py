@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+sys.path += [os.path.join(ROOT, lab) for lab in ('Lab3', 'Lab4', 'Lab5')]
@@ -0,0 +1,98 @@
+# Synthetic .m programs built from the Lab3 grammar, every one of them
+# parses, type checks and runs. The size argument scales each program
+# roughly linearly in its number of tokens.
+#
+#     python -m benchmarks.corpus directory [scale]
+
+import os
+import random
+import sys
+
+
+def nested(depth):  # loops, ifs and blocks nested <depth> levels deep, every loop runs once
+    lines = ['s = 0;']
+    for level in range(depth):
+        indent = '    ' * level
+        if level % 3 == 0:
+            lines.append('{}for i{} = 1:1 {{'.format(indent, level))
+        elif level % 3 == 1:
+            lines.append('{}if (s >= 0) {{'.format(indent))
+        else:
+            lines.append('{}w{} = 0;'.format(indent, level))
+            lines.append('{}while (w{} < 1) {{'.format(indent, level))
+            lines.append('{}    w{} += 1;'.format(indent, level))
+        lines.append('{}    s += {};'.format(indent, level))
+    lines += ['    ' * level + '}' for level in reversed(range(depth))]
+    lines.append('print s;')
+    return '\n'.join(lines) + '\n'
+
+
+def flat(length):  # one long block of scalar, string and matrix statements
+    lines = ['x0 = 1;', 'f0 = 0.5;', 'm0 = ones(3);', 't0 = "text";']
+    for i in range(1, length):
+        kind = i % 4
+        if kind == 0:
+            lines.append('x{} = x{} * 2 + {} - x{} / 4;'.format(i, i - 4, i, i - 4))
+        elif kind == 1:
+            lines.append('f{} = -f{} .* 1.5 + {}.25;'.format(i, i - 4 if i > 4 else 0, i))
+        elif kind == 2:
+            lines.append("m{0} = m{1}' * m{1} ./ 3 + eye(3) - eye(3);".format(i, i - 4 if i > 4 else 0))
+        else:
+            lines.append('t{} = t{} + "{}";'.format(i, i - 4 if i > 4 else 0, i))
+            if i % 100 == 3:
+                lines.append('print x{}, f{}, t{};'.format(i - 3, i - 2, i))
+    return '\n'.join(lines) + '\n'
+
+
+def matrix(size):  # one <size> x <size> constant literal and one with expressions
+    numbers = random.Random(size)
+    rows = [', '.join(str(numbers.randint(-99, 99)) for _ in range(size)) for _ in range(size)]
+    mixed = [', '.join('k + {}'.format(j) if j % 7 == 0 else str(j + 0.5) for j in range(size)) for _ in range(size)]
+    return 'k = 1;\nA = [{}];\nB = [{}];\nC = A .+ B;\nprint C[{}, {}];\n'.format(
+        ';\n     '.join(rows), ';\n     '.join(mixed), size, size)
+
+
+def loops(iterations):  # tight scalar loops in the style of Lab3/example3.m
+    return '''N = {n};
+s = 0;
+for i = 1:N {{
+    for j = i:N {{
+        s += i * j;
+    }}
+}}
+k = N * N;
+while (k > 0) {{
+    if (k < 5)
+        i = 1;
+    else if (k < 10)
+        i = 2;
+    else
+        i = 3;
+    k = k - 1;
+}}
+print s, i;
+'''.format(n=iterations)
+
+
+# default size of every generator at scale 1
+PROGRAMS = {
+    'nested': (nested, 60),
+    'flat': (flat, 2000),
+    'matrix': (matrix, 150),
+    'loops': (loops, 60),
+}
+
+
+def generate(scale=1.0):  # name -> source of every program
+    return {name: generator(max(1, int(size * scale))) for name, (generator, size) in PROGRAMS.items()}
+
+
+def main(directory, scale=1.0):
+    os.makedirs(directory, exist_ok=True)
+    for name, source in generate(float(scale)).items():
+        with open(os.path.join(directory, name + '.m'), 'w') as file:
+            file.write(source)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,50 @@
+# Peak memory and time of matrix assignments with copy-on-write sharing
+# compared with eager copying.
+#
+#     python -m benchmarks.cow_memory [size] [copies]
+
+import sys
+import time
+import tracemalloc
+
+from Mparser import MParser
+from Interpreter import Interpreter
+from MatrixValue import MatrixValue
+
+
+def program(size, copies):
+    lines = ['A = ones({});'.format(size)]
+    lines += ['B{} = A;'.format(i) for i in range(copies)]
+    lines += ['B0[1, 1] = 2;']
+    return '\n'.join(lines)
+
+
+def measure(ast):
+    tracemalloc.start()
+    start = time.perf_counter()
+    ast.accept(Interpreter())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(size=1000, copies=10):
+    parser = MParser()
+    ast = parser.run(program(size, copies))
+    results = {'copy-on-write': measure(ast)}
+
+    share = MatrixValue.share
+    MatrixValue.share = MatrixValue.copy
+    try:
+        results['eager copy'] = measure(ast)
+    finally:
+        MatrixValue.share = share
+
+    print('ones({0}) assigned {1} times'.format(size, copies))
+    for name, (elapsed, peak) in results.items():
+        print('{:>14}: {:8.3f} s {:10.1f} MiB peak'.format(name, elapsed, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
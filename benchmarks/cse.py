@@ -0,0 +1,56 @@
+# Common subexpression elimination on a loop which recomputes the same
+# matrix products, run by the Interpreter and the VM with and without
+# the pass. Both versions have to print the same.
+#
+#     python -m benchmarks.cse [n] [iterations]
+
+import contextlib
+import io
+import sys
+import time
+
+from Mparser import MParser
+from Interpreter import Interpreter
+from Compiler import Compiler
+from VM import VM
+from Subexpressions import Subexpressions
+
+PROGRAM = '''
+A = ones({n});
+B = eye({n}) * 2;
+for i = 1:{iterations} {{
+    C = A' * B + i;
+    D = A' * B - i;
+    E = (A' * B) .* C;
+    s = (i + 1) * (i + 2) + 1;
+    t = (i + 1) * (i + 2) - 1;
+}}
+print C[1, 1], D[1, 1], E[1, 1], s, t;
+'''
+
+
+def timed(fn, *args):
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        fn(*args)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main(n=40, iterations=200):
+    ast = MParser().run(PROGRAM.format(n=n, iterations=iterations))
+    optimizer = Subexpressions()
+    optimized = optimizer.optimize(ast)
+    print('{} temporaries'.format(len(optimizer.report)))
+    results = {}
+    for name, tree in (('plain', ast), ('cse', optimized)):
+        results[name, 'interpreter'] = timed(tree.accept, Interpreter())
+        results[name, 'vm'] = timed(VM().run, Compiler().compile(tree))
+    for engine in ('interpreter', 'vm'):
+        (plain, expected), (cse, output) = results['plain', engine], results['cse', engine]
+        assert output == expected, (engine, output, expected)
+        print('{:>12}: {:8.3f} s plain {:8.3f} s cse {:6.2f}x'.format(engine, plain, cse, plain / cse))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+# Dead code elimination on a generated script full of stores nobody
+# reads and branches that never run: nodes, bytecode instructions and
+# run time of the Interpreter before and after the pass. Both versions
+# have to print the same.
+#
+#     python -m benchmarks.dead_code [iterations]
+
+import contextlib
+import io
+import sys
+import time
+
+from Mparser import MParser
+from Interpreter import Interpreter
+from Compiler import Compiler
+from Phases import size
+from DeadCode import DeadCode
+
+PROGRAM = '''
+total = 0;
+for i = 1:{iterations} {{
+    square = i * i;
+    cube = square * i;
+    scratch = ones(4) * i;
+    if (1 > 2) {{
+        print "debug", i;
+    }}
+    total += i;
+    if (i > {iterations}) {{
+        break;
+        print "unreachable";
+    }}
+    last = cube + square;
+}}
+print total;
+'''
+
+
+def timed(fn, *args):
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        fn(*args)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main(iterations=20000):
+    ast = MParser().run(PROGRAM.format(iterations=iterations))
+    optimizer = DeadCode()
+    optimized = optimizer.optimize(ast)
+    for line, message in optimizer.report:
+        print('line {}: {}'.format(line, message))
+    print('{:>6} {:>6} {:>13} {:>9}'.format('', 'nodes', 'instructions', 'run [s]'))
+    outputs = []
+    for name, tree in (('plain', ast), ('dce', optimized)):
+        elapsed, output = timed(tree.accept, Interpreter())
+        outputs.append(output)
+        print('{:>6} {:>6} {:>13} {:>9.3f}'.format(name, size(tree), len(Compiler().compile(tree)), elapsed))
+    assert outputs[0] == outputs[1], outputs
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+# Distinct nodes, retained memory and parse time of the corpus parsed
+# as a plain tree and hash-consed, where identical leaves and pure
+# expressions are shared. Both trees have to print the same.
+#
+#     python -m benchmarks.hash_consing [scale]
+
+import sys
+import time
+import tracemalloc
+
+import AST
+from Mparser import MParser
+import TreePrinter
+
+from benchmarks.corpus import generate
+
+
+def distinct(node):  # nodes reachable from <node>, each shared one counted once
+    seen, pending = set(), [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending += node
+        elif isinstance(node, AST.Node) and id(node) not in seen:
+            seen.add(id(node))
+            pending += node.children
+            if isinstance(node.leaf, AST.Node):
+                pending.append(node.leaf)
+    return len(seen)
+
+
+def measure(parser, source, share):
+    tracemalloc.start()
+    start = time.perf_counter()
+    ast = parser.parse(source, parser.state(share=share)).ast
+    elapsed = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return ast, elapsed, retained
+
+
+def main(scale=1.0):
+    parser = MParser()
+    parser.build()
+    print('{:>8} {:>10} {:>10} {:>10} {:>10} {:>8} {:>8}'.format(
+        'program', 'nodes', 'shared', 'KiB', 'shared', 'ms', 'shared'))
+    for program, source in generate(float(scale)).items():
+        plain, plain_time, plain_memory = measure(parser, source, False)
+        shared, shared_time, shared_memory = measure(parser, source, True)
+        if plain.printTree() != shared.printTree():
+            print('MISMATCH {}'.format(program))
+            sys.exit(1)
+        print('{:>8} {:>10} {:>10} {:>10.0f} {:>10.0f} {:>8.1f} {:>8.1f}'.format(
+            program, distinct(plain), distinct(shared), plain_memory / 1024, shared_memory / 1024,
+            1000 * plain_time, 1000 * shared_time))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
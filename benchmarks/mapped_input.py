@@ -0,0 +1,52 @@
+# Peak memory and time of parsing a large generated script read into a
+# str compared with lexing it from a memory-mapped file. The retained
+# column is what the finished tree takes, the peak above it is the cost
+# of the input. Pages of the map belong to the page cache and are not
+# traced.
+#
+#     python -m benchmarks.mapped_input [statements]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Mparser import MParser
+
+from benchmarks.corpus import flat
+
+
+def measure(parser, filename, mapped):
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mapped:
+        lexer = parser.matrix_lexer.mapped(filename)
+        state = parser.parse(None, parser.state(lexer=lexer))
+        lexer.close()
+    else:
+        with open(filename) as file:
+            state = parser.parse(file.read())
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert not state.failed
+    return elapsed, retained, peak
+
+
+def main(statements=50000):
+    parser = MParser()
+    parser.build()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'large.m')
+        with open(filename, 'w') as file:
+            file.write(flat(int(statements)))
+        print('{} statements, {:.1f} MiB'.format(statements, os.path.getsize(filename) / 2 ** 20))
+        for name, mapped in (('read', False), ('mmap', True)):
+            elapsed, retained, peak = measure(parser, filename, mapped)
+            print('{:>6} {:>8.2f} s  retained {:>8.1f} MiB  peak {:>8.1f} MiB'.format(
+                name, elapsed, retained / 2 ** 20, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,55 @@
+# Matrix multiplication kernels: naive triple loop over nested lists
+# against the blocked kernel used by MatrixValue, and a sweep of tile
+# sizes for picking MatrixValue.block_size.
+#
+#     python -m benchmarks.matmul [size ...]
+#     python -m benchmarks.matmul --tiles size
+
+import random
+import sys
+import time
+
+from MatrixValue import MatrixValue, blocked_matmul
+
+SIZES = 10, 20, 50, 100, 200, 500, 1000
+NAIVE_LIMIT = 200
+TILES = 8, 16, 32, 64, 128, 256, 1024
+
+
+def naive_matmul(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(len(b))) for j in range(len(b[0]))] for i in range(len(a))]
+
+
+def random_matrix(size):
+    return MatrixValue((size, size), [random.random() for _ in range(size * size)])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def sizes(sizes=SIZES):
+    print('{:>6} {:>12} {:>12}'.format('size', 'naive [s]', 'blocked [s]'))
+    for size in sizes:
+        a, b = random_matrix(size), random_matrix(size)
+        naive = '-'
+        if size <= NAIVE_LIMIT:
+            rows = [[a[i, j] for j in range(1, size + 1)] for i in range(1, size + 1)]
+            naive = '{:.4f}'.format(timed(naive_matmul, rows, rows))
+        print('{:>6} {:>12} {:>12.4f}'.format(size, naive, timed(a.matmul, b)))
+
+
+def tiles(size):
+    a, b = random_matrix(size), random_matrix(size)
+    print('{:>6} {:>12}'.format('tile', 'time [s]'))
+    for tile in TILES:
+        print('{:>6} {:>12.4f}'.format(tile, timed(blocked_matmul, a.data, b.transpose().values(), size, size, size, tile)))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--tiles']:
+        tiles(int(sys.argv[2]))
+    else:
+        sizes(list(map(int, sys.argv[1:])) or SIZES)
@@ -0,0 +1,85 @@
+# Stress test of one shared MParser used from a thread pool: every
+# script of the corpus, the Lab3 examples and a few broken scripts are
+# lexed and parsed many times at once, and each result has to equal the
+# one of a sequential run. Exits with status 1 on any difference. On a
+# free-threaded CPython the parallel time shows the scaling as well.
+#
+#     python -m benchmarks.parallel_parse [threads] [rounds] [scale]
+
+import concurrent.futures
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+import time
+
+from MLexer import MLexer
+from Mparser import MParser
+import TreePrinter
+
+from benchmarks import ROOT
+from benchmarks.corpus import generate
+
+BROKEN = {
+    'syntax': 'a = 1;\nb = a +;\nprint b;\n',
+    'rows': 'A = [1, 2;\n     3];\nprint A;\n',
+    'character': 'x = 1;\ny = x $ 2;\n',
+}
+
+
+def scripts(scale):
+    result = dict(generate(scale), **BROKEN)
+    for filename in sorted(glob.glob(os.path.join(ROOT, 'Lab3', 'example*.m'))):
+        with open(filename) as file:
+            result[os.path.basename(filename)] = file.read()
+    return result
+
+
+def tokens(lexer, text):  # type, value and position of every token
+    lexer = lexer.clone()
+    lexer.input(text)
+    return [(token.type, token.value) + MLexer.get_position(token, lexer) for token in lexer]
+
+
+def parse(parser, text):
+    state = parser.parse(text)
+    return state.failed, None if state.ast is None else state.ast.printTree()
+
+
+def task(parser, name, text):
+    return name, tokens(parser.matrix_lexer, text), parse(parser, text)
+
+
+def main(threads=8, rounds=20, scale=0.2):
+    threads, rounds = int(threads), int(rounds)
+    parser = MParser()
+    parser.build()
+    programs = scripts(float(scale))
+    work = [name for name in programs for _ in range(rounds)]
+    random.Random(0).shuffle(work)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # error messages of the broken scripts
+        start = time.perf_counter()
+        expected = {name: task(parser, name, text) for name, text in programs.items()}
+        for name in work[len(programs):]:
+            task(parser, name, programs[name])
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(lambda name: task(parser, name, programs[name]), work))
+        parallel = time.perf_counter() - start
+
+    wrong = sorted({name for name, lexed, parsed in results if (name, lexed, parsed) != expected[name]})
+    print('{} parses of {} scripts, sequential {:.3f} s, {} threads {:.3f} s'.format(
+        len(work), len(programs), sequential, threads, parallel))
+    for name in wrong:
+        print('MISMATCH {}'.format(name))
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
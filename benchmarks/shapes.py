@@ -0,0 +1,77 @@
+# Element-wise loops over matrices of constant size, run by the
+# Interpreter and the VM with every access bounds checked and with the
+# accesses the shape pass proves in bounds left unchecked. The two
+# builds run in turns, each round in the opposite order, and the median
+# of the rounds is reported, so that warm-up favours neither. Both
+# versions have to print the same.
+#
+#     python -m benchmarks.shapes [n] [rounds]
+
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+from Mparser import MParser
+from Interpreter import Interpreter
+from Compiler import Compiler
+from Peephole import Peephole
+from VM import VM
+from Shapes import Shapes
+
+PROGRAM = '''
+n = {n};
+A = zeros(n);
+B = ones(n) * 2;
+for i = 1:n {{
+    for j = 1:n {{
+        A[i, j] = B[i, j] * i + j;
+    }}
+}}
+s = 0;
+for i = 1:n {{
+    for j = 1:n {{
+        s += A[i, j] * B[j, i] - A[(i - 1) * n + j];
+    }}
+}}
+C = A' * B;
+for k = 1:n {{
+    C[k, k] += A[k, n] + B[n, k];
+}}
+print s, C[n, n];
+'''
+
+
+def timed(fn, *args):
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        fn(*args)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main(n=120, rounds=5):
+    ast = MParser().run(PROGRAM.format(n=n))
+    shapes = Shapes()
+    proven = shapes.optimize(ast)
+    print('{} of {} accesses proven in bounds'.format(len(proven.unchecked), len(shapes.proven)))
+    builds = (('checked', ast), ('shapes', proven))
+    code = {name: Peephole().optimize(Compiler().compile(tree)) for name, tree in builds}
+    times, outputs = {}, {}
+    for round in range(rounds):
+        for name, tree in builds if round % 2 == 0 else builds[::-1]:
+            for engine, run in (('interpreter', lambda: tree.accept(Interpreter())), ('vm', lambda: VM().run(code[name]))):
+                elapsed, output = timed(run)
+                times.setdefault((name, engine), []).append(elapsed)
+                outputs.setdefault(engine, output)
+                assert output == outputs[engine], (engine, name, output, outputs[engine])
+    for engine in ('interpreter', 'vm'):
+        checked, unchecked = (statistics.median(times[name, engine]) for name in ('checked', 'shapes'))
+        print('{:>12}: {:8.3f} s checked {:8.3f} s shapes {:6.2f}x  (medians of {} rounds, best {:.3f} s / {:.3f} s)'.format(
+            engine, checked, unchecked, checked / unchecked, rounds,
+            min(times['checked', engine]), min(times['shapes', engine])))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
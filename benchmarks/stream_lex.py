@@ -0,0 +1,75 @@
+# Chunked lexing has to give the tokens, positions and diagnostics of
+# lexing the whole text. Every script of the corpus and the examples is
+# cut into random chunks, pushed through feed and pulled through token,
+# and compared with MLexer. Exits with status 1 on any difference and
+# prints the throughput of both ways.
+#
+#     python -m benchmarks.stream_lex [trials] [scale]
+
+import glob
+import os
+import random
+import sys
+import time
+
+from MLexer import MLexer
+
+from benchmarks import ROOT
+from benchmarks.corpus import generate
+
+TAIL = 'x = 1.5e+3 * 2.e-1;\ny = "a \\" b" <= x;  # comment\nz = 1.'  # tokens which need lookahead
+
+
+def scripts(scale):
+    result = generate(scale)
+    for filename in sorted(glob.glob(os.path.join(ROOT, 'Lab3', 'example*.m')) + [os.path.join(ROOT, 'Lab5', 'example.txt')]):
+        with open(filename) as file:
+            result[os.path.basename(filename)] = file.read()
+    return {name: text + TAIL for name, text in result.items()}
+
+
+def chunks(text, numbers, size):
+    result, start = [], 0
+    while start < len(text):
+        end = start + numbers.randint(1, size)
+        result.append(text[start:end])
+        start = end
+    return result
+
+
+def lexed(tokens, lexer):
+    return [(token.type, token.value, token.lineno, token.lexpos, MLexer.get_column(token, lexer)) for token in tokens]
+
+
+def main(trials=10, scale=0.2):
+    mLexer = MLexer()
+    numbers = random.Random(0)
+    wrong = []
+    whole = streamed = 0.0
+    for name, text in scripts(float(scale)).items():
+        start = time.perf_counter()
+        lexer = mLexer.clone()
+        lexer.input(text)
+        expected = lexed(lexer, lexer), [record.dict() for record in lexer.diagnostics.records]
+        whole += time.perf_counter() - start
+        for trial in range(int(trials)):
+            pieces = chunks(text, numbers, numbers.choice((1, 4, 64, 4096)))
+            start = time.perf_counter()
+            stream = mLexer.stream(pieces)
+            pulled = lexed(stream, stream), [record.dict() for record in stream.diagnostics.records]
+            streamed += time.perf_counter() - start
+            stream = mLexer.stream()
+            tokens = [token for piece in pieces for token in stream.feed(piece)] + stream.close()
+            pushed = lexed(tokens, stream), [record.dict() for record in stream.diagnostics.records]
+            if pulled != expected or pushed != expected:
+                wrong.append(name)
+                break
+    print('whole text {:.3f} s, chunked {:.3f} s per run'.format(whole, streamed / int(trials)))
+    for name in wrong:
+        print('MISMATCH {}'.format(name))
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
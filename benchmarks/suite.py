@@ -0,0 +1,114 @@
+# Throughput of every stage of the toolchain on the synthetic corpus:
+# lexing, parsing, tree printing, type checking and execution on both
+# the interpreter and the VM. Results are written as JSON and compared
+# against an earlier run, a stage slower by more than the threshold is
+# a regression and makes the suite exit with status 1.
+#
+#     python -m benchmarks.suite [--scale 1] [--repeat 3] [--output results.json]
+#                                [--baseline baseline.json] [--threshold 0.1]
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+
+from MLexer import MLexer
+from Mparser import MParser
+import TreePrinter
+from TypeChecker import TypeChecker
+from Interpreter import Interpreter
+from Compiler import Compiler
+from Peephole import Peephole
+from VM import VM
+from Phases import size
+
+from benchmarks.corpus import generate
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def lex(source):
+    lexer = MLexer()
+    lexer.input(source)
+    return sum(1 for _ in iter(lexer.token, None))
+
+
+def measure(source, parser, repeat):  # stage -> seconds and units processed per second
+    ast = parser.parse(source).ast
+    code = Peephole().optimize(Compiler().compile(ast))
+    tokens, nodes = lex(source), size(ast)
+    stages = {
+        'lex': (lambda: lex(source), tokens),
+        'parse': (lambda: parser.parse(source), tokens),
+        'print': (ast.printTree, nodes),
+        'check': (lambda: TypeChecker().visit(ast), nodes),
+        'run': (lambda: ast.accept(Interpreter()), nodes),
+        'vm': (lambda: VM().run(code), len(code)),
+    }
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage, (fn, units) in stages.items():
+            seconds = best(fn, repeat)
+            results[stage] = {'seconds': seconds, 'units': units, 'throughput': units / seconds}
+    return results
+
+
+def compare(results, baseline, threshold):  # prints the ratio of every stage, returns the regressions
+    regressions = []
+    for program, stages in sorted(results.items()):
+        for stage, result in stages.items():
+            old = baseline.get(program, {}).get(stage)
+            if old is None:
+                continue
+            ratio = result['seconds'] / old['seconds']
+            regressed = ratio > 1 + threshold
+            if regressed:
+                regressions.append((program, stage))
+            print('{:>8} {:>6} {:>10.4f} -> {:>8.4f} s {:>6.2f}x{}'.format(
+                program, stage, old['seconds'], result['seconds'], ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main():
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument('--scale', type=float, default=1.0, help='size of the generated programs')
+    arguments.add_argument('--repeat', type=int, default=3, help='runs of every stage, the fastest counts')
+    arguments.add_argument('--output', help='write the results to this JSON file')
+    arguments.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    arguments.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown against the baseline')
+    args = arguments.parse_args()
+
+    parser = MParser()
+    parser.build()
+    results = {}
+    for program, source in generate(args.scale).items():
+        results[program] = measure(source, parser, args.repeat)
+        for stage, result in results[program].items():
+            print('{:>8} {:>6} {:>10.4f} s {:>12.0f} units/s'.format(
+                program, stage, result['seconds'], result['throughput']))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'scale': args.scale, 'results': results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['scale'] != args.scale:
+            print('baseline was measured at scale {}'.format(baseline['scale']))
+        print()
+        if compare(results, baseline['results'], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Profile-guided choice of superinstructions: counts how often every
+# instruction of the benchmarks.vm program runs, ranks the candidate
+# fusions by the dispatches they save and times the VM before and after.
+#
+#     python -m benchmarks.superinstructions [n]
+
+import sys
+
+from Mparser import MParser
+from Compiler import Compiler
+from Bytecode import opnames
+from Peephole import Peephole
+from VM import VM
+
+from benchmarks.vm import PROGRAM, timed
+
+
+def main(n=150):
+    code = Compiler().compile(MParser().run(PROGRAM.format(n=n)))
+    counts = Peephole.profile(code, VM())
+    total = sum(counts)
+    savings = Peephole.savings(code, counts)
+    for fused, saved in sorted(savings.items(), key=lambda item: -item[1]):
+        print('{:>26}: {:>10} dispatches saved ({:5.1f}%)'.format(opnames[fused], saved, 100.0 * saved / total))
+    selected = Peephole.select(savings, total)
+    print('selected:', ', '.join(opnames[fused] for fused in selected))
+
+    optimized = Peephole(selected).optimize(code)
+    after = sum(Peephole.profile(optimized, VM()))
+    print('{:>26}: {:>10} -> {} ({:.2f}x fewer)'.format('dispatches', total, after, total / after))
+    before, fused = timed(VM().run, code), timed(VM().run, optimized)
+    print('{:>26}: {:8.3f} s -> {:.3f} s ({:.2f}x)'.format('time', before, fused, before / fused))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
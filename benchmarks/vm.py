@@ -0,0 +1,53 @@
+# Tree-walking Interpreter against the bytecode VM on example3.m-style
+# loops.
+#
+#     python -m benchmarks.vm [n]
+
+import sys
+import time
+
+from Mparser import MParser
+from Interpreter import Interpreter
+from Compiler import Compiler
+from VM import VM
+
+PROGRAM = '''
+N = {n};
+M = {n};
+s = 0;
+for i = 1:N {{
+    for j = i:M {{
+        s += i * j;
+    }}
+}}
+k = {n} * {n};
+while(k > 0) {{
+    if(k < 5)
+        i = 1;
+    else if(k < 10)
+        i = 2;
+    else
+        i = 3;
+    k = k - 1;
+}}
+'''
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(n=150):
+    ast = MParser().run(PROGRAM.format(n=n))
+    code = Compiler().compile(ast)
+    tree = timed(ast.accept, Interpreter())
+    vm = timed(VM().run, code)
+    print('{:>12}: {:8.3f} s'.format('interpreter', tree))
+    print('{:>12}: {:8.3f} s'.format('vm', vm))
+    print('{:>12}: {:8.2f}x'.format('speedup', tree / vm))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))